@@ -0,0 +1,222 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from account.models import AuthToken
+
+
+class TokenCache:
+    """
+    Bounded, thread safe LRU of token key -> ``AuthToken`` (with its user loaded) whose entries expire after ``ttl``
+    seconds. When ``cache_alias`` is set, misses fall back to that Django cache before hitting the database. Tokens
+    are also found by their user and client name, for logins.
+
+    The in-process LRU is only invalidated in the process that handled the invalidating request, so on a
+    multi-process deployment ``ttl`` is the upper bound for other workers to notice a logout or deactivation.
+    """
+    key_prefix = 'auth-token:'
+    user_key_prefix = 'auth-token-user:'
+
+    def __init__(self, max_size=10000, ttl=60, cache_alias=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self._entries = OrderedDict()
+        # (user_id, name) -> key of the cached tokens
+        self._user_keys = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared_cache(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def get(self, key):
+        token = self._get_local(key)
+        if token is None:
+            shared = self.shared_cache.get(self.key_prefix + key) if self.shared_cache else None
+            token = self._from_shared(key, shared)
+        return token
+
+    async def aget(self, key):
+        token = self._get_local(key)
+        if token is None:
+            shared = await self.shared_cache.aget(self.key_prefix + key) if self.shared_cache else None
+            token = self._from_shared(key, shared)
+        return token
+
+    def get_user_token(self, user_id, name):
+        """Return the cached token of the user ``user_id`` for the client ``name``, or None."""
+        with self._lock:
+            key = self._user_keys.get((user_id, name))
+        if key is None and self.shared_cache:
+            key = self.shared_cache.get(f'{self.user_key_prefix}{user_id}:{name}')
+        token = self.get(key) if key else None
+        if token is not None and (token.user_id, token.name) != (user_id, name):
+            return None
+        return token
+
+    def set(self, token):
+        self._store(token.key, token)
+        if self.shared_cache:
+            self.shared_cache.set_many({
+                self.key_prefix + token.key: token,
+                f'{self.user_key_prefix}{token.user_id}:{token.name}': token.key,
+            }, self.ttl)
+
+    async def aset(self, token):
+        self._store(token.key, token)
+        if self.shared_cache:
+            await self.shared_cache.aset(self.key_prefix + token.key, token, self.ttl)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+        if self.shared_cache:
+            self.shared_cache.delete_many([self.key_prefix + key for key in keys])
+
+    def delete_user(self, user):
+        """Drop every cached token of ``user``, e.g. after a deactivation or a password change."""
+        keys = list(AuthToken.objects.filter(user=user).values_list('key', flat=True))
+        with self._lock:
+            keys += [key for key, (token, _) in self._entries.items() if token.user_id == user.pk]
+        if keys:
+            self.delete(*set(keys))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+            }
+
+    def _get_local(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._copy(entry[0])
+            if entry is not None:
+                self._remove(key)
+        return None
+
+    def _from_shared(self, key, token):
+        with self._lock:
+            if token is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+        self._store(key, token)
+        return self._copy(token)
+
+    def _store(self, key, token):
+        with self._lock:
+            self._entries[key] = (self._copy(token), time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            self._user_keys[(token.user_id, token.name)] = key
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        # Called with the lock held.
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            user_key = (entry[0].user_id, entry[0].name)
+            if self._user_keys.get(user_key) == key:
+                del self._user_keys[user_key]
+
+    @staticmethod
+    def _copy(token):
+        # Views cache related objects (profiles, tokens) on request.user, so every request gets its own copy.
+        token_copy = copy.copy(token)
+        token_copy.user = copy.copy(token.user)
+        return token_copy
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                config = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+                _token_cache = TokenCache(
+                    max_size=config.get('MAX_SIZE', 10000),
+                    ttl=config.get('TTL', 60),
+                    cache_alias=config.get('CACHE_ALIAS'),
+                )
+    return _token_cache
+
+
+class _TokenKeyAuthentication(TokenAuthentication):
+    """Runs ``TokenAuthentication``'s header parsing and returns the token key instead of querying it."""
+
+    def authenticate_credentials(self, key):
+        return key
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``TokenAuthentication`` of :class:`AuthToken` keys, resolved through :class:`TokenCache` before the database."""
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        token = cache.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(token)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        if token.is_expired():
+            raise exceptions.AuthenticationFailed('Token has expired.')
+
+        return token.user, token
+
+    async def aauthenticate(self, request):
+        """Async counterpart of ``authenticate`` using the async ORM on cache misses."""
+        key = _TokenKeyAuthentication().authenticate(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        cache = get_token_cache()
+        token = await cache.aget(key)
+        if token is None:
+            model = self.get_model()
+            try:
+                token = await model.objects.select_related('user').aget(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            if token.user.is_active:
+                await cache.aset(token)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        if token.is_expired():
+            raise exceptions.AuthenticationFailed('Token has expired.')
+
+        return token.user, token
@@ -0,0 +1,108 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class HashingSlotTimeout(Exception):
+    """No hashing slot was free within the timeout of :func:`hashing_queue_timeout`."""
+
+
+_hashing_slots = None
+_hashing_slots_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_hashing_slots():
+    global _hashing_slots
+    if _hashing_slots is None:
+        with _hashing_slots_lock:
+            if _hashing_slots is None:
+                _hashing_slots = threading.BoundedSemaphore(settings.PASSWORD_HASHING['MAX_CONCURRENCY'])
+    return _hashing_slots
+
+
+@contextmanager
+def hashing_queue_timeout(timeout):
+    """
+    Within, waiting more than ``timeout`` seconds for a hashing slot raises ``HashingSlotTimeout``. Requests use it
+    to answer a login burst with a 503, other callers (management commands, the importer) wait for their slot.
+    """
+    _local.timeout = timeout
+    try:
+        yield
+    finally:
+        _local.timeout = None
+
+
+@contextmanager
+def hashing_slot():
+    """
+    Hold one of this worker's ``PASSWORD_HASHING['MAX_CONCURRENCY']`` hashing slots, so a login burst queues
+    instead of taking every CPU from the other requests.
+    """
+    if getattr(_local, 'held', False):
+        # PBKDF2's verify() calls encode(), the slot is already ours.
+        yield
+        return
+
+    slots = get_hashing_slots()
+    if not slots.acquire(timeout=getattr(_local, 'timeout', None)):
+        raise HashingSlotTimeout()
+    _local.held = True
+    try:
+        yield
+    finally:
+        _local.held = False
+        slots.release()
+
+
+class HashingSlotMixin:
+    def encode(self, *args, **kwargs):
+        with hashing_slot():
+            return super().encode(*args, **kwargs)
+
+    def verify(self, *args, **kwargs):
+        with hashing_slot():
+            return super().verify(*args, **kwargs)
+
+
+class Argon2PasswordHasher(HashingSlotMixin, hashers.Argon2PasswordHasher):
+    """Argon2id with the costs of ``PASSWORD_HASHING``, needs the ``argon2-cffi`` package."""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_HASHING['ARGON2_TIME_COST']
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_HASHING['ARGON2_MEMORY_COST']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_HASHING['ARGON2_PARALLELISM']
+
+
+class ScryptPasswordHasher(HashingSlotMixin, hashers.ScryptPasswordHasher):
+    """scrypt with the costs of ``PASSWORD_HASHING``."""
+
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_HASHING['SCRYPT_WORK_FACTOR']
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_HASHING['SCRYPT_BLOCK_SIZE']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_HASHING['SCRYPT_PARALLELISM']
+
+
+class PBKDF2PasswordHasher(HashingSlotMixin, hashers.PBKDF2PasswordHasher):
+    pass
+
+
+class PBKDF2SHA1PasswordHasher(HashingSlotMixin, hashers.PBKDF2SHA1PasswordHasher):
+    pass
@@ -0,0 +1,177 @@
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import transaction, DatabaseError
+
+from account.models import User, StudentProfile, TeacherProfile, AuthToken
+from account.serializers import UserImportSerializer, StudentProfileSerializer, TeacherProfileSerializer
+
+PROFILE_SERIALIZERS = {
+    User.UserType.STUDENT: StudentProfileSerializer,
+    User.UserType.TEACHER: TeacherProfileSerializer,
+}
+
+
+def read_rows(file, file_format):
+    """
+    Return an iterator over the rows of a CSV or JSON lines text file as dicts, empty CSV cells are left out. A JSON
+    line that can't be parsed is yielded as its ``ValueError``, so the rows after it are still imported.
+    """
+    if file_format == 'csv':
+        return _read_csv(file)
+    elif file_format == 'jsonl':
+        return _read_jsonl(file)
+    raise ValueError(f'Unsupported format {file_format}, use csv or jsonl.')
+
+
+def _read_csv(file):
+    for row in csv.DictReader(file):
+        yield {key: value for key, value in row.items() if key and value not in ('', None)}
+
+
+def _read_jsonl(file):
+    for line in file:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield e
+
+
+def _number_rows(rows, errors, max_rows=None):
+    """
+    Number ``rows`` from 1. The file is read while the previous chunks are already written, when it can't be read any
+    further (not UTF-8, broken CSV quoting) that is reported on the row it stopped at and the rows after it are left
+    out, instead of failing the whole import. So are the rows after ``max_rows``.
+    """
+    number = 0
+    try:
+        for number, row in enumerate(rows, start=1):
+            if max_rows is not None and number > max_rows:
+                errors.append({'row': number, 'email': None, 'errors': {'non_field_errors': [
+                    f'Only {max_rows} rows can be imported at once, the rows from this one on were left out.'
+                ]}})
+                return
+            yield number, row
+    except UnicodeDecodeError as e:
+        errors.append({'row': number + 1, 'email': None,
+                       'errors': {'non_field_errors': [f'The file is not UTF-8 encoded from this row on: {e}']}})
+    except (ValueError, csv.Error) as e:
+        errors.append({'row': number + 1, 'email': None,
+                       'errors': {'non_field_errors': [f'The file could not be read from this row on: {e}']}})
+
+
+@contextmanager
+def password_hasher(processes=1):
+    """Yield a function hashing a list of passwords, in a pool of ``processes`` processes unless it is 1."""
+    if processes == 1:
+        yield lambda passwords: [make_password(password) for password in passwords]
+        return
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=django.setup) as executor:
+        yield lambda passwords: list(executor.map(make_password, passwords, chunksize=64))
+
+
+def import_users(rows, activate=False, chunk_size=1000, processes=1, max_rows=None):
+    """
+    Create students and teachers, with their token and profile, from ``rows`` in chunks of ``chunk_size``.
+
+    Rows are validated like ``UserRegistrationAPIView`` does and written with ``bulk_create``. Passwords are hashed in
+    the calling process unless ``processes`` asks for a pool. Rows after ``max_rows`` are reported and left out.
+    Returns ``{'created': count, 'errors': [{'row': row_number, 'email': email, 'errors': {...}}]}``.
+    """
+    report = {'created': 0, 'errors': []}
+    seen_emails = set()
+    rows = _number_rows(rows, report['errors'], max_rows)
+
+    with password_hasher(processes) as hash_passwords:
+        while chunk := list(islice(rows, chunk_size)):
+            valid_rows = _validate_chunk(chunk, seen_emails, report['errors'])
+            if not valid_rows:
+                continue
+
+            passwords = hash_passwords([user_data['password'] for _, user_data, _ in valid_rows])
+            try:
+                report['created'] += _write_chunk(valid_rows, passwords, activate)
+            except DatabaseError as e:
+                report['errors'] += [
+                    {'row': number, 'email': user_data['email'], 'errors': {'non_field_errors': [str(e)]}}
+                    for number, user_data, _ in valid_rows
+                ]
+
+    return report
+
+
+def _validate_chunk(chunk, seen_emails, errors):
+    validated = []
+    for number, row in chunk:
+        if isinstance(row, ValueError):
+            errors.append({'row': number, 'email': None, 'errors': {'non_field_errors': [f'Invalid JSON: {row}']}})
+            continue
+
+        row_errors = {}
+        user_serializer = UserImportSerializer(data=row)
+        if user_serializer.is_valid():
+            user_data = user_serializer.validated_data
+            user_data['email'] = User.objects.normalize_email(user_data['email'])
+            user_data.setdefault('user_type', User.UserType.STUDENT)
+
+            profile_serializer_class = PROFILE_SERIALIZERS.get(user_data['user_type'])
+            if profile_serializer_class is None:
+                row_errors['user_type'] = ['Only students and teachers can be imported.']
+            else:
+                profile_serializer = profile_serializer_class(data=row)
+                if not profile_serializer.is_valid():
+                    row_errors.update(profile_serializer.errors)
+
+            if user_data['email'] in seen_emails:
+                row_errors['email'] = ['Duplicate email in the imported file.']
+            seen_emails.add(user_data['email'])
+        else:
+            row_errors.update(user_serializer.errors)
+
+        if row_errors:
+            errors.append({'row': number, 'email': row.get('email') if isinstance(row, dict) else None,
+                           'errors': row_errors})
+        else:
+            validated.append((number, user_data, profile_serializer.validated_data))
+
+    existing = set(User.objects.filter(email__in=[user_data['email'] for _, user_data, _ in validated])
+                   .values_list('email', flat=True))
+    for number, user_data, _ in validated:
+        if user_data['email'] in existing:
+            errors.append({'row': number, 'email': user_data['email'],
+                           'errors': {'email': ['user with this email already exists.']}})
+
+    return [row for row in validated if row[1]['email'] not in existing]
+
+
+def _write_chunk(rows, passwords, activate):
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(
+                email=user_data['email'],
+                name=user_data['name'],
+                user_type=user_data['user_type'],
+                password=password,
+                is_active=activate,
+            )
+            for (_, user_data, _), password in zip(rows, passwords)
+        ])
+        AuthToken.objects.bulk_create([AuthToken(key=AuthToken.generate_key(), user=user) for user in users])
+
+        profiles = {User.UserType.STUDENT: [], User.UserType.TEACHER: []}
+        for user, (_, _, profile_data) in zip(users, rows):
+            profile_model = StudentProfile if user.user_type == User.UserType.STUDENT else TeacherProfile
+            profiles[user.user_type].append(
+                profile_model(**{**profile_data, 'name': user.name, 'email': user.email}, user=user, updated_by=user)
+            )
+        StudentProfile.objects.bulk_create(profiles[User.UserType.STUDENT])
+        TeacherProfile.objects.bulk_create(profiles[User.UserType.TEACHER])
+
+    return len(users)
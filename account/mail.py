@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from account.models import QueuedEmail
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    """Store an email in the outbox; it is delivered by the ``send_queued_emails`` management command."""
+    return QueuedEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        recipients=list(recipient_list),
+    )
+
+
+def claim_mail(batch_size, lease):
+    """Take a batch of due emails for ``lease`` seconds, after which they are due again if the sender died."""
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            QueuedEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=QueuedEmail.Status.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        for email in emails:
+            email.attempts += 1
+            email.next_attempt_at = now + timezone.timedelta(seconds=lease)
+        QueuedEmail.objects.bulk_update(emails, ['attempts', 'next_attempt_at'])
+    return emails
+
+
+def send_queued_mail(batch_size=None, max_attempts=None, retry_backoff=None):
+    """
+    Send one batch of due emails over a single connection and return ``(sent, failed)``.
+    Failed emails are retried with exponential backoff until ``max_attempts`` is reached, when the connection can't
+    be opened that counts as a failed attempt of every email of the batch.
+    """
+    config = getattr(settings, 'EMAIL_OUTBOX', {})
+    batch_size = batch_size or config.get('BATCH_SIZE', 100)
+    max_attempts = max_attempts or config.get('MAX_ATTEMPTS', 5)
+    retry_backoff = retry_backoff or config.get('RETRY_BACKOFF', 60)
+
+    # Claimed in a short transaction, the emails are sent without holding row locks or a database transaction.
+    emails = claim_mail(batch_size, config.get('LEASE', 300))
+    if not emails:
+        return 0, 0
+
+    def fail(email, error):
+        email.last_error = str(error)
+        if email.attempts >= max_attempts:
+            email.status = QueuedEmail.Status.FAILED
+        else:
+            email.next_attempt_at = timezone.now() + timezone.timedelta(
+                seconds=retry_backoff * 2 ** (email.attempts - 1))
+
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        failed = len(emails)
+        for email in emails:
+            fail(email, e)
+    else:
+        with connection:
+            for email in emails:
+                message = EmailMessage(email.subject, email.body, email.from_email, email.recipients,
+                                       connection=connection)
+                try:
+                    message.send()
+                except Exception as e:
+                    failed += 1
+                    fail(email, e)
+                else:
+                    sent += 1
+                    email.status = QueuedEmail.Status.SENT
+                    email.sent_at = timezone.now()
+
+    QueuedEmail.objects.bulk_update(emails, ['status', 'last_error', 'next_attempt_at', 'sent_at'])
+    return sent, failed
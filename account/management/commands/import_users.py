@@ -0,0 +1,33 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from account.importer import read_rows, import_users
+
+
+class Command(BaseCommand):
+    help = 'Import students and teachers, with their token and profile, from a CSV or JSONL file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row, or JSONL file with one user per line.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--activate', action='store_true', help='Create the users as active.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Users written per transaction.')
+        parser.add_argument('--processes', type=int, help='Password hashing processes, defaults to the CPU count.')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if file_format not in ('csv', 'jsonl'):
+            raise CommandError('Only CSV or JSONL files are allowed, pass --format for other extensions.')
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as file:
+            report = import_users(
+                read_rows(file, file_format),
+                activate=options['activate'],
+                chunk_size=options['chunk_size'],
+                processes=options['processes'] or os.cpu_count(),
+            )
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']} ({error['email']}): {error['errors']}")
+        self.stdout.write(f"Imported {report['created']} user(s), {len(report['errors'])} row(s) failed.")
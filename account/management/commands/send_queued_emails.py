@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from account.mail import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails from the outbox in batches over a single connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Number of emails sent per connection.')
+        parser.add_argument('--max-attempts', type=int, help='Attempts before an email is marked as failed.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting.')
+        parser.add_argument('--sleep', type=float, default=5, help='Seconds to wait when the outbox is empty.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued_mail(batch_size=options['batch_size'], max_attempts=options['max_attempts'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} email(s), {failed} failed.')
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_queued_email'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='passwordreset',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='passwordreset',
+            index=models.Index(fields=['user', 'code', 'is_used'], name='password_reset_user_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=models.Index(fields=['semester', 'roll'], name='student_profiles_sem_roll_idx'),
+        ),
+    ]
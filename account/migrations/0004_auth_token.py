@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:39
+
+import account.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_authtoken_tokens(apps, schema_editor):
+    # Tokens issued by rest_framework.authtoken keep working as the users' default (web) token.
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('account', 'AuthToken')
+    AuthToken.objects.bulk_create(
+        (AuthToken(key=token.key, user_id=token.user_id, name='web') for token in Token.objects.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0003_query_indexes'),
+        ('authtoken', '0003_tokenproxy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40, unique=True)),
+                ('name', models.CharField(default='web', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(default=account.models.get_token_expiry, null=True)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'auth_tokens',
+                'constraints': [models.UniqueConstraint(fields=('user', 'name'), name='auth_tokens_user_name_uniq')],
+            },
+        ),
+        migrations.RunPython(copy_authtoken_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0004_auth_token'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['-date_joined'], name='users_inactive_joined_idx'),
+        ),
+    ]
@@ -1,6 +1,9 @@
+import binascii
+import os
 import random
 import string
 
+from django.conf import settings
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractBaseUser
 from django.db import models
@@ -55,6 +58,11 @@ class User(AbstractBaseUser):
 
     class Meta:
         db_table = 'users'
+        indexes = [
+            # The registration approvals, a small part of the users
+            models.Index(fields=['-date_joined'], condition=models.Q(is_active=False),
+                         name='users_inactive_joined_idx'),
+        ]
 
 
 def generate_reset_code():
@@ -62,7 +70,8 @@ def generate_reset_code():
 
 
 class PasswordReset(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Indexed through password_reset_user_code_idx, which starts with user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     code = models.CharField(max_length=6, default=generate_reset_code)
     created_at = models.DateTimeField(auto_now_add=True)
     is_used = models.BooleanField(default=False)
@@ -72,6 +81,42 @@ class PasswordReset(models.Model):
 
     class Meta:
         db_table = 'password_reset_tokens'
+        indexes = [
+            models.Index(fields=['user', 'code', 'is_used'], name='password_reset_user_code_idx'),
+        ]
+
+
+def get_token_expiry():
+    ttl = settings.AUTH_TOKEN['TTL']
+    return timezone.now() + timezone.timedelta(seconds=ttl) if ttl else None
+
+
+class AuthToken(models.Model):
+    """API token of a user for one client (``name``, e.g. web or mobile), so each device has its own session."""
+    key = models.CharField(max_length=40, unique=True)
+    # Indexed through auth_tokens_user_name_uniq, which starts with user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='auth_tokens', db_index=False)
+    name = models.CharField(max_length=20, default='web')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(null=True, default=get_token_expiry)
+
+    @staticmethod
+    def generate_key():
+        return binascii.hexlify(os.urandom(20)).decode()
+
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = self.generate_key()
+        return super().save(*args, **kwargs)
+
+    def is_expired(self):
+        return self.expires_at is not None and timezone.now() >= self.expires_at
+
+    class Meta:
+        db_table = 'auth_tokens'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='auth_tokens_user_name_uniq'),
+        ]
 
 
 class TeacherProfile(models.Model):
@@ -135,3 +180,34 @@ class StudentProfile(models.Model):
 
     class Meta:
         db_table = 'student_profiles'
+        indexes = [
+            models.Index(fields=['semester', 'roll'], name='student_profiles_sem_roll_idx'),
+        ]
+
+
+class QueuedEmail(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, null=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = 'queued_emails'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
@@ -8,6 +8,11 @@ class IsAdmin(BasePermission):
         return request.user.user_type == User.UserType.ADMIN
 
 
+class IsStudent(BasePermission):
+    def has_permission(self, request, view):
+        return request.user.user_type == User.UserType.STUDENT
+
+
 class IsAdminOrTeacher(BasePermission):
     def has_permission(self, request, view):
         return request.user.user_type == User.UserType.TEACHER or request.user.user_type == User.UserType.ADMIN
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib.auth import authenticate
 from rest_framework import serializers
 
@@ -20,6 +21,16 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
 
+class UserImportSerializer(UserSerializer):
+    """``UserSerializer`` without the per row unique email query, the importer checks emails per chunk."""
+
+    class Meta(UserSerializer.Meta):
+        extra_kwargs = {
+            **UserSerializer.Meta.extra_kwargs,
+            'email': {'validators': []},
+        }
+
+
 class PasswordResetRequestSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
@@ -55,6 +66,8 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
 class TokenSerializer(serializers.Serializer):
     email = serializers.EmailField(write_only=True)
     password = serializers.CharField(write_only=True, trim_whitespace=False)
+    # Name of the client's token, users are logged in on each client separately
+    client = serializers.ChoiceField(choices=settings.AUTH_TOKEN['NAMES'], required=False, write_only=True)
     token = serializers.CharField(read_only=True)
 
     def validate(self, attrs):
@@ -1,12 +1,27 @@
-from django.test import TestCase
+import json
+import tempfile
+import threading
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
-from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 
+from account.authentication import get_token_cache
 from account.enums import Semester
-from account.models import PasswordReset, TeacherProfile, StudentProfile
+from account.mail import claim_mail, queue_mail, send_queued_mail
+from account.models import PasswordReset, TeacherProfile, StudentProfile, QueuedEmail, AuthToken
+from dgc.testing import explain, find_query, analyze, QueryCountTestMixin
 from django.core import mail
 
 User = get_user_model()
@@ -16,7 +31,7 @@ class UserAuthTests(TestCase):
     def setUp(self):
         self.client = APIClient()
         self.user = User.objects.create_user(email='testuser@example.com', password='password123')
-        self.token = Token.objects.create(user=self.user)
+        self.token = AuthToken.objects.create(user=self.user)
 
     def test_user_registration(self):
         """Test user registration"""
@@ -60,7 +75,7 @@ class UserAuthTests(TestCase):
         url = reverse('user_logout')
         response = self.client.post(url)
         self.assertEqual(response.status_code, 204)
-        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        self.assertFalse(AuthToken.objects.filter(user=self.user).exists())
 
     def test_user_unsuccessful_logout(self):
         """Test user unsuccessful logout"""
@@ -69,6 +84,68 @@ class UserAuthTests(TestCase):
         self.assertEqual(response.status_code, 401)
 
 
+class TokenServiceTests(TestCase):
+    def setUp(self):
+        get_token_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='student@example.com', password='password123')
+
+    def login(self, **data):
+        return self.client.post(reverse('user_login'), {
+            'email': 'student@example.com',
+            'password': 'password123',
+            **data
+        })
+
+    def get_auth_user(self, key):
+        return self.client.get(reverse('auth_user'), HTTP_AUTHORIZATION='Token ' + key)
+
+    def test_existing_token_is_read(self):
+        key = self.login().data['token']
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.login()
+        self.assertEqual(response.data['token'], key)
+        self.assertFalse([query for query in context.captured_queries if not query['sql'].startswith('SELECT')])
+        # Found in the authentication cache by user and client
+        self.assertFalse([query for query in context.captured_queries if 'auth_tokens' in query['sql']])
+
+        get_token_cache().clear()
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.login().data['token'], key)
+        self.assertTrue([query for query in context.captured_queries if 'auth_tokens' in query['sql']])
+
+        # Put in the authentication cache at login
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_auth_user(key).status_code, 200)
+
+    def test_token_per_client(self):
+        web_key = self.login().data['token']
+        mobile_key = self.login(client='mobile').data['token']
+        self.assertNotEqual(web_key, mobile_key)
+        names = AuthToken.objects.filter(user=self.user).values_list('name', flat=True)
+        self.assertEqual(set(names), {'web', 'mobile'})
+
+        self.client.post(reverse('user_logout'), HTTP_AUTHORIZATION='Token ' + mobile_key)
+        self.assertEqual(self.get_auth_user(mobile_key).status_code, 401)
+        self.assertEqual(self.get_auth_user(web_key).status_code, 200)
+
+        self.assertEqual(self.login(client='desktop').status_code, 400)
+
+    def test_expired_token_is_rotated(self):
+        token = AuthToken.objects.create(user=self.user, expires_at=timezone.now() - timezone.timedelta(seconds=1))
+
+        response = self.get_auth_user(token.key)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['detail'], 'Token has expired.')
+
+        response = self.login()
+        self.assertNotEqual(response.data['token'], token.key)
+        self.assertGreater(response.data['expires_at'], timezone.now())
+        self.assertEqual(AuthToken.objects.get(user=self.user).key, response.data['token'])
+        self.assertEqual(self.get_auth_user(response.data['token']).status_code, 200)
+
+
 class PasswordResetTests(TestCase):
     def setUp(self):
         # Create a test user
@@ -81,9 +158,13 @@ class PasswordResetTests(TestCase):
 
         # Assert that the response is 200 OK
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(mail.outbox), 1)
 
-        # Assert that an email has been sent
+        # Assert that the email is only queued by the request
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(QueuedEmail.objects.filter(status=QueuedEmail.Status.PENDING).count(), 1)
+
+        # Assert that an email has been sent by the worker
+        call_command('send_queued_emails', stdout=StringIO())
         self.assertEqual(len(mail.outbox), 1)
 
         # Assert that the email is sent to the correct user
@@ -173,8 +254,8 @@ class UserProfileAPITest(TestCase):
                                                              semester=Semester.FIFTH_SEMESTER, section="A")
 
         # Generate tokens for both users
-        self.teacher_token = Token.objects.create(user=self.teacher_user)
-        self.student_token = Token.objects.create(user=self.student_user)
+        self.teacher_token = AuthToken.objects.create(user=self.teacher_user)
+        self.student_token = AuthToken.objects.create(user=self.student_user)
 
     def test_get_teacher_profile(self):
         # Authenticate the teacher by passing the token in the header
@@ -201,3 +282,549 @@ class UserProfileAPITest(TestCase):
     def tearDown(self):
         # Clear authentication credentials after each test
         self.client.credentials()  # Reset client credentials to default
+
+
+class StudentListAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+        self.teacher_user = User.objects.create_user(email="teacher@example.com", user_type="teacher",
+                                                     password="password")
+        self.teacher_token = AuthToken.objects.create(user=self.teacher_user)
+
+        students = [
+            ('first-b@example.com', Semester.FIRST_SEMESTER, 'CSE', 'B', 2),
+            ('first-a@example.com', Semester.FIRST_SEMESTER, 'CSE', 'A', 1),
+            ('fifth@example.com', Semester.FIFTH_SEMESTER, 'EEE', 'A', 3),
+        ]
+        for email, semester, department, section, roll in students:
+            user = User.objects.create_user(email=email, password="password")
+            StudentProfile.objects.create(user=user, name=email, email=email, semester=semester,
+                                          department=department, section=section, roll=roll)
+
+    def get_students(self, **params):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.teacher_token.key)
+        response = self.client.get(reverse('student_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_students_grouped_by_semester(self):
+        data = self.get_students()
+
+        self.assertEqual(list(data.keys()), [Semester.FIRST_SEMESTER, Semester.FIFTH_SEMESTER])
+        self.assertEqual([student['roll'] for student in data[Semester.FIRST_SEMESTER]], [1, 2])
+        self.assertEqual(data[Semester.FIFTH_SEMESTER][0]['email'], 'fifth@example.com')
+        self.assertIn('permanent_address', data[Semester.FIFTH_SEMESTER][0])
+
+    def test_students_filtered(self):
+        self.assertEqual(list(self.get_students(semester=Semester.FIRST_SEMESTER).keys()), [Semester.FIRST_SEMESTER])
+        self.assertEqual(list(self.get_students(department='EEE').keys()), [Semester.FIFTH_SEMESTER])
+
+        data = self.get_students(semester=Semester.FIRST_SEMESTER, section='B')
+        self.assertEqual([student['roll'] for student in data[Semester.FIRST_SEMESTER]], [2])
+
+    def test_students_empty(self):
+        self.assertEqual(self.get_students(semester=Semester.EIGHTH_SEMESTER), {})
+
+    def test_students_forbidden_for_students(self):
+        user = User.objects.create_user(email="student@example.com", password="password")
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + AuthToken.objects.create(user=user).key)
+        response = self.client.get(reverse('student_list'))
+        self.assertEqual(response.status_code, 403)
+
+
+class UserListAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_user(email="admin@example.com", user_type="admin", password="password")
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + AuthToken.objects.create(user=self.admin_user).key)
+
+        self.teacher_user = User.objects.create_user(email="teacher@example.com", name='Ada Lovelace',
+                                                     user_type="teacher", password="password")
+        TeacherProfile.objects.create(user=self.teacher_user, name='Ada Lovelace', department='CSE')
+        self.students = []
+        for i in range(3):
+            user = User.objects.create_user(email=f"student{i}@example.com", name=f'Student {i}', password="password",
+                                            is_active=i != 0)
+            StudentProfile.objects.create(user=user, name=user.name, semester=Semester.FIRST_SEMESTER, roll=i)
+            self.students.append(user)
+        self.unprofiled = User.objects.create_user(email="new@example.com", name='New', password="password")
+
+    def get_users(self, **params):
+        response = self.client.get(reverse('user_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_users_paginated(self):
+        data = self.get_users(page_size=2)
+        self.assertEqual(data['count'], 5)
+        self.assertIsNotNone(data['next'])
+        self.assertEqual([user['email'] for user in data['results']], ['new@example.com', 'student2@example.com'])
+        self.assertEqual(set(data['results'][0]), {'id', 'email', 'name', 'user_type', 'is_active'})
+
+        data = self.get_users(page_size=2, page=3)
+        self.assertEqual([user['email'] for user in data['results']], ['teacher@example.com'])
+        self.assertIsNone(data['next'])
+
+    def test_users_filtered(self):
+        data = self.get_users(is_active='false')
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['id'], self.students[0].id)
+
+        self.assertEqual(self.get_users(type='teacher')['count'], 1)
+        self.assertEqual(self.get_users(q='ada')['results'][0]['id'], self.teacher_user.id)
+        self.assertEqual(self.get_users(q='student1@ example')['count'], 1)
+        self.assertEqual(self.get_users(q='student', is_active='true', type='student')['count'], 2)
+
+        response = self.client.get(reverse('user_list'), {'is_active': 'maybe'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_users_with_profile(self):
+        users = {user['email']: user for user in self.get_users(profile='1')['results']}
+        self.assertEqual(users['teacher@example.com']['profile']['department'], 'CSE')
+        self.assertNotIn('roll', users['teacher@example.com']['profile'])
+        self.assertEqual(users['student2@example.com']['profile']['roll'], 2)
+        self.assertEqual(users['student2@example.com']['profile']['semester'], Semester.FIRST_SEMESTER)
+        self.assertIsNone(users['new@example.com']['profile'])
+
+    def test_users_forbidden_for_teachers(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + AuthToken.objects.create(user=self.teacher_user).key)
+        response = self.client.get(reverse('user_list'))
+        self.assertEqual(response.status_code, 403)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.cache = get_token_cache()
+        self.cache.clear()
+
+        self.admin_user = User.objects.create_user(email="admin@example.com", user_type="admin", password="password")
+        self.admin_token = AuthToken.objects.create(user=self.admin_user)
+        self.user = User.objects.create_user(email="user@example.com", password="password")
+        self.token = AuthToken.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_token_lookup_cached(self):
+        self.assertEqual(self.client.get(reverse('auth_user')).status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('auth_user'))
+        self.assertEqual(response.data['email'], 'user@example.com')
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_logout_invalidates_token(self):
+        self.client.get(reverse('auth_user'))
+        self.assertEqual(self.client.post(reverse('user_logout')).status_code, 204)
+        self.assertEqual(self.client.get(reverse('auth_user')).status_code, 401)
+
+    def test_deactivation_invalidates_token(self):
+        self.client.get(reverse('auth_user'))
+
+        admin_client = APIClient()
+        admin_client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        response = admin_client.patch(reverse('update_user_active_status'), {'user_id': self.user.id, 'is_active': False})
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get(reverse('auth_user')).status_code, 401)
+
+    def test_password_reset_invalidates_token(self):
+        self.client.get(reverse('auth_user'))
+        self.assertEqual(self.cache.stats()['size'], 1)
+
+        self.client.post(reverse('password_reset_request'), {'email': 'user@example.com'})
+        response = self.client.post(reverse('password_reset_confirm'), {
+            'email': 'user@example.com',
+            'code': PasswordReset.objects.get(user=self.user).code,
+            'new_password': 'newpassword123'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_cache_bounded(self):
+        cache = type(self.cache)(max_size=1, ttl=60)
+        cache.set(self.token)
+        cache.set(self.admin_token)
+        self.assertIsNone(cache.get(self.token.key))
+        self.assertEqual(cache.get(self.admin_token.key).user, self.admin_user)
+
+
+class QueuedEmailTests(TestCase):
+    def test_batch_sent_over_one_connection(self):
+        for i in range(3):
+            queue_mail('Subject', 'Body', 'noreply@example.com', [f'user{i}@example.com'])
+
+        with mock.patch('account.mail.get_connection', wraps=mail.get_connection) as get_connection:
+            self.assertEqual(send_queued_mail(batch_size=10), (3, 0))
+        self.assertEqual(get_connection.call_count, 1)
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(QueuedEmail.objects.exclude(status=QueuedEmail.Status.SENT).exists())
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+    def test_failed_email_retried_with_backoff(self):
+        email = queue_mail('Subject', 'Body', 'noreply@example.com', ['user@example.com'])
+
+        with mock.patch('account.mail.EmailMessage.send', side_effect=SMTPException('unavailable')):
+            self.assertEqual(send_queued_mail(max_attempts=2, retry_backoff=60), (0, 1))
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, QueuedEmail.Status.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now() + timezone.timedelta(seconds=50))
+
+        # Not due yet
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+        email.next_attempt_at = timezone.now()
+        email.save()
+        with mock.patch('account.mail.EmailMessage.send', side_effect=SMTPException('unavailable')):
+            self.assertEqual(send_queued_mail(max_attempts=2), (0, 1))
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, QueuedEmail.Status.FAILED)
+        self.assertEqual(email.last_error, 'unavailable')
+
+    def test_connection_failure_counts_as_attempt(self):
+        emails = [queue_mail('Subject', 'Body', 'noreply@example.com', [f'user{i}@example.com']) for i in range(2)]
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open', create=True,
+                        side_effect=ConnectionRefusedError('refused')):
+            self.assertEqual(send_queued_mail(retry_backoff=60), (0, 2))
+            # The command keeps running, the batch is not due again yet.
+            call_command('send_queued_emails', stdout=StringIO())
+
+        for email in emails:
+            email.refresh_from_db()
+            self.assertEqual(email.status, QueuedEmail.Status.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertEqual(email.last_error, 'refused')
+            self.assertGreater(email.next_attempt_at, timezone.now() + timezone.timedelta(seconds=50))
+        self.assertEqual(mail.outbox, [])
+
+    def test_claimed_emails_leased(self):
+        email = queue_mail('Subject', 'Body', 'noreply@example.com', ['user@example.com'])
+
+        self.assertEqual(claim_mail(batch_size=10, lease=300), [email])
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now() + timezone.timedelta(seconds=250))
+        # Another sender skips the claimed email until its lease runs out.
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+
+class IndexUsageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher_user = User.objects.create_user(email="teacher@example.com", user_type="teacher",
+                                                    password="password")
+        cls.teacher_token = AuthToken.objects.create(user=cls.teacher_user)
+        cls.admin_user = User.objects.create_user(email="admin@example.com", user_type="admin", password="password")
+        cls.admin_token = AuthToken.objects.create(user=cls.admin_user)
+
+        users = User.objects.bulk_create(User(email=f'student{i}@example.com', name=f'Student {i}') for i in range(2000))
+        semesters = Semester.values
+        StudentProfile.objects.bulk_create(
+            StudentProfile(user=user, name=user.name, semester=semesters[i % 8], roll=i) for i, user in enumerate(users))
+        PasswordReset.objects.bulk_create(PasswordReset(user=user, is_used=True) for user in users)
+        analyze()
+
+    def test_student_list_uses_semester_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('student_list'), {'semester': Semester.THIRD_SEMESTER},
+                                       HTTP_AUTHORIZATION='Token ' + self.teacher_token.key)
+            b''.join(response.streaming_content)
+
+        plan = explain(find_query(queries.captured_queries, 'student_profiles'))
+        self.assertIn('student_profiles_sem_roll_idx', plan)
+
+    def test_user_list_uses_active_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user_list'), {'is_active': 'false'},
+                                       HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        self.assertEqual(response.status_code, 200)
+
+        plan = explain(find_query(queries.captured_queries, 'users'))
+        self.assertIn('users_inactive_joined_idx', plan)
+
+    def test_password_reset_confirm_uses_code_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('password_reset_confirm'), {
+                'email': 'student7@example.com',
+                'code': '123456',
+                'new_password': 'newpassword123'
+            })
+        self.assertEqual(response.status_code, 400)
+
+        plan = explain(find_query(queries.captured_queries, 'password_reset_tokens'))
+        self.assertIn('password_reset_user_code_idx', plan)
+
+
+class UserImportTests(TestCase):
+    csv_content = (
+        'email,password,name,user_type,semester,roll,department,designation\n'
+        's1@example.com,password123,Student One,student,1st,1,CSE,\n'
+        's2@example.com,password123,Student Two,student,2nd,2,CSE,\n'
+        't1@example.com,password123,Teacher One,teacher,,,CSE,Lecturer\n'
+        's1@example.com,password123,Student One Again,student,1st,3,CSE,\n'
+        'existing@example.com,password123,Existing,student,1st,4,CSE,\n'
+        's3@example.com,password123,No Semester,student,,5,CSE,\n'
+        'a1@example.com,password123,Admin,admin,,,,\n'
+    )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_user(email="admin@example.com", user_type="admin", password="password")
+        self.admin_token = AuthToken.objects.create(user=self.admin_user)
+        User.objects.create_user(email="existing@example.com", password="password")
+
+    def test_import_csv(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        response = self.client.post(reverse('user_import'), {
+            'file': SimpleUploadedFile('users.csv', self.csv_content.encode()),
+            'activate': 'true',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual([(error['row'], list(error['errors'])) for error in response.data['errors']],
+                         [(4, ['email']), (6, ['semester']), (7, ['user_type']), (5, ['email'])])
+
+        student = User.objects.get(email='s2@example.com')
+        self.assertTrue(student.is_active)
+        self.assertTrue(student.check_password('password123'))
+        self.assertTrue(AuthToken.objects.filter(user=student).exists())
+        self.assertEqual(student.student_profile.semester, Semester.SECOND_SEMESTER)
+        self.assertEqual(student.student_profile.roll, 2)
+        self.assertEqual(User.objects.get(email='t1@example.com').teacher_profile.designation, 'Lecturer')
+
+    def test_import_invalid_json_line(self):
+        lines = [json.dumps({'email': f'student{i}@example.com', 'password': 'password123', 'name': f'Student {i}',
+                             'semester': '1st', 'roll': i}) for i in range(3)]
+        lines.insert(1, '{"email": ')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        response = self.client.post(reverse('user_import'), {
+            'file': SimpleUploadedFile('users.jsonl', '\n'.join(lines).encode()),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual([(error['row'], list(error['errors'])) for error in response.data['errors']],
+                         [(2, ['non_field_errors'])])
+
+    def test_import_not_utf8(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        response = self.client.post(reverse('user_import'), {
+            'file': SimpleUploadedFile('users.csv', self.csv_content.encode() + 'é,x\n'.encode('latin-1')),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(response.data['errors'][0]['row'], 1)
+        self.assertIn('not UTF-8', response.data['errors'][0]['errors']['non_field_errors'][0])
+        self.assertFalse(User.objects.filter(email='s1@example.com').exists())
+
+    @override_settings(USER_IMPORT={'PROCESSES': 2, 'MAX_ROWS': 2})
+    def test_import_max_rows(self):
+        lines = [json.dumps({'email': f'student{i}@example.com', 'password': 'password123', 'name': f'Student {i}',
+                             'semester': '1st', 'roll': i}) for i in range(4)]
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        response = self.client.post(reverse('user_import'), {
+            'file': SimpleUploadedFile('users.jsonl', '\n'.join(lines).encode()),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [3])
+        self.assertTrue(User.objects.get(email='student1@example.com').check_password('password123'))
+        self.assertFalse(User.objects.filter(email='student2@example.com').exists())
+
+    def test_import_command_stops_at_unreadable_row(self):
+        with tempfile.NamedTemporaryFile('wb', suffix='.csv') as file:
+            file.write(b'email,password,name,semester,roll\n')
+            for i in range(3):
+                file.write(f'student{i}@example.com,password123,Student {i},1st,{i}\n'.encode())
+            # Far enough into the file for the decoder to hit it after the first chunk was written.
+            file.write(b'x' * 16384 + b'\xe9\n')
+            file.flush()
+
+            stdout, stderr = StringIO(), StringIO()
+            call_command('import_users', file.name, '--chunk-size', '2', '--processes', '1', stdout=stdout,
+                         stderr=stderr)
+
+        self.assertIn('Imported 3 user(s), 1 row(s) failed.', stdout.getvalue())
+        self.assertIn('Row 4', stderr.getvalue())
+
+    def test_import_requires_admin(self):
+        user = User.objects.get(email='existing@example.com')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + AuthToken.objects.create(user=user).key)
+        response = self.client.post(reverse('user_import'), {
+            'file': SimpleUploadedFile('users.csv', self.csv_content.encode()),
+        })
+        self.assertEqual(response.status_code, 403)
+
+    def test_import_users_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as file:
+            for i in range(5):
+                file.write(json.dumps({'email': f'student{i}@example.com', 'password': 'password123',
+                                       'name': f'Student {i}', 'semester': '3rd', 'roll': i}) + '\n')
+            file.flush()
+
+            stdout = StringIO()
+            call_command('import_users', file.name, '--chunk-size', '2', '--processes', '1', stdout=stdout)
+
+        self.assertIn('Imported 5 user(s), 0 row(s) failed.', stdout.getvalue())
+        self.assertEqual(StudentProfile.objects.filter(semester=Semester.THIRD_SEMESTER).count(), 5)
+        self.assertFalse(User.objects.get(email='student0@example.com').is_active)
+
+
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='student@example.com', password='password123')
+
+    def login(self):
+        return self.client.post(reverse('user_login'), {'email': 'student@example.com', 'password': 'password123'})
+
+    def test_new_passwords_use_configured_hasher(self):
+        self.assertTrue(self.user.password.startswith('scrypt$16384$'))
+
+    def test_rehash_on_login(self):
+        User.objects.filter(id=self.user.id).update(password=make_password('password123', hasher='pbkdf2_sha256'))
+
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$16384$'))
+        self.assertTrue(self.user.check_password('password123'))
+
+    def test_rehash_on_changed_cost(self):
+        with override_settings(PASSWORD_HASHING={**settings.PASSWORD_HASHING, 'SCRYPT_WORK_FACTOR': 2 ** 12}):
+            self.user.set_password('password123')
+            self.user.save()
+        self.assertTrue(self.user.password.startswith('scrypt$4096$'))
+
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$16384$'))
+
+    @override_settings(PASSWORD_HASHING={**settings.PASSWORD_HASHING, 'QUEUE_TIMEOUT': 0.01})
+    def test_hashing_slots(self):
+        slots = threading.BoundedSemaphore(1)
+        with mock.patch('account.hashers._hashing_slots', slots):
+            slots.acquire()
+            response = self.login()
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.data['detail'].code, 'password_hashing_busy')
+
+            slots.release()
+            self.assertEqual(self.login().status_code, 200)
+
+    @override_settings(PASSWORD_HASHING={**settings.PASSWORD_HASHING, 'QUEUE_TIMEOUT': 0.01})
+    def test_hashing_outside_requests_waits_for_slot(self):
+        slots = threading.BoundedSemaphore(1)
+        with mock.patch('account.hashers._hashing_slots', slots):
+            slots.acquire()
+            threading.Timer(0.1, slots.release).start()
+            self.assertTrue(self.user.check_password('password123'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryCountTests(QueryCountTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_user(email="admin@example.com", user_type="admin", password="password")
+        self.admin_token = AuthToken.objects.create(user=self.admin_user)
+        self.teacher_user = User.objects.create_user(email="teacher@example.com", user_type="teacher",
+                                                     password="password")
+        TeacherProfile.objects.create(user=self.teacher_user, name='Teacher')
+        self.teacher_token = AuthToken.objects.create(user=self.teacher_user)
+        self.student_user = User.objects.create_user(email="student@example.com", password="password")
+        StudentProfile.objects.create(user=self.student_user, name='Student', semester=Semester.FIRST_SEMESTER)
+        self.student_token = AuthToken.objects.create(user=self.student_user)
+        self.created = 0
+
+    def create_rows(self, count):
+        password = make_password('password')
+        students = User.objects.bulk_create(
+            User(email=f'student{self.created + i}@example.com', name='Student', password=password)
+            for i in range(count)
+        )
+        StudentProfile.objects.bulk_create(
+            StudentProfile(user=user, name=user.name, semester=Semester.values[i % 8], roll=i, updated_by=user)
+            for i, user in enumerate(students)
+        )
+        teachers = User.objects.bulk_create(
+            User(email=f'teacher{self.created + i}@example.com', name='Teacher', user_type='teacher',
+                 password=password)
+            for i in range(count)
+        )
+        TeacherProfile.objects.bulk_create(
+            TeacherProfile(user=user, name=user.name, updated_by=user) for user in teachers
+        )
+        self.created += count
+
+    def authenticate(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def new_email(self):
+        self.created += 1
+        return f'new{self.created}@example.com'
+
+    def test_auth_user(self):
+        self.authenticate(self.student_token)
+        self.assertQueryCountConstant(1, lambda: self.client.get(reverse('auth_user')))
+
+    def test_user_profile(self):
+        for token in (self.student_token, self.teacher_token):
+            self.authenticate(token)
+            self.assertQueryCountConstant(2, lambda: self.client.get(reverse('user-profile')))
+            self.assertQueryCountConstant(3, lambda: self.client.patch(reverse('user-profile'), {'name': 'Name'}))
+
+    def test_user_registration(self):
+        self.assertQueryCountConstant(6, lambda email: self.client.post(reverse('user_registration'), {
+            'name': 'New Student',
+            'email': email,
+            'password': 'password123',
+            'user_type': 'student',
+            'semester': '5th',
+        }), prepare=self.new_email)
+
+    def test_user_import(self):
+        self.authenticate(self.admin_token)
+        self.assertQueryCountConstant(7, lambda email: self.client.post(reverse('user_import'), {
+            'file': SimpleUploadedFile('users.csv', f'email,password,name,semester\n{email},pw,New,1st\n'.encode()),
+        }), prepare=self.new_email)
+
+    def test_update_user_active_status(self):
+        self.authenticate(self.admin_token)
+        self.assertQueryCountConstant(4, lambda: self.client.patch(reverse('update_user_active_status'), {
+            'user_id': self.student_user.id,
+            'is_active': False,
+        }))
+
+    def test_login_and_logout(self):
+        self.assertQueryCountConstant(2, lambda: self.client.post(reverse('user_login'), {
+            'email': 'student@example.com',
+            'password': 'password',
+        }))
+        self.assertQueryCountConstant(
+            2, lambda token: self.client.post(reverse('user_logout'), HTTP_AUTHORIZATION='Token ' + token),
+            prepare=lambda: AuthToken.objects.get_or_create(user=self.student_user)[0].key
+        )
+
+    def test_password_reset(self):
+        self.assertQueryCountConstant(
+            7, lambda: self.client.post(reverse('password_reset_request'), {'email': 'student@example.com'})
+        )
+        self.assertQueryCountConstant(5, lambda code: self.client.post(reverse('password_reset_confirm'), {
+            'email': 'student@example.com',
+            'code': code,
+            'new_password': 'new-password',
+        }), prepare=lambda: PasswordReset.objects.create(user=self.student_user).code)
+
+    def test_user_list(self):
+        self.authenticate(self.admin_token)
+        self.assertQueryCountConstant(3, lambda: self.client.get(reverse('user_list')))
+        self.assertQueryCountConstant(3, lambda: self.client.get(reverse('user_list'), {'profile': '1'}))
+
+    def test_student_list(self):
+        self.authenticate(self.teacher_token)
+        self.assertQueryCountConstant(2, lambda: self.client.get(reverse('student_list')))
+        self.assertQueryCountConstant(2, lambda: self.client.get(reverse('student_list'), {'semester': '1st'}))
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from account.authentication import get_token_cache
+from account.models import AuthToken, get_token_expiry
+
+
+def get_default_token_name():
+    return settings.AUTH_TOKEN['NAMES'][0]
+
+
+def get_token(user, name=None):
+    """
+    Return the valid token of ``user`` for the client ``name``. An existing token is read from the authentication
+    cache, or the database without locking the row, and a token is written only when it is missing (issued) or
+    expired (rotated). The token is put in the authentication cache, so the client's next requests do not look it up
+    again.
+    """
+    name = name or get_default_token_name()
+    token = get_token_cache().get_user_token(user.pk, name)
+    if token is None:
+        token = AuthToken.objects.filter(user=user, name=name).first()
+    if token is None:
+        token = _issue_token(user, name)
+    elif token.is_expired():
+        token = rotate_token(token)
+
+    token.user = user
+    get_token_cache().set(token)
+    return token
+
+
+def _issue_token(user, name):
+    try:
+        with transaction.atomic():
+            return AuthToken.objects.create(user=user, name=name)
+    except IntegrityError:
+        # Issued by a concurrent login of the same client.
+        return AuthToken.objects.get(user=user, name=name)
+
+
+def rotate_token(token):
+    """Give ``token`` a new key and expiry, when concurrent logins rotate it the first new key is kept."""
+    old_key = token.key
+    values = {'key': AuthToken.generate_key(), 'created_at': timezone.now(), 'expires_at': get_token_expiry()}
+    rotated = AuthToken.objects.filter(pk=token.pk, key=old_key).update(**values)
+    get_token_cache().delete(old_key)
+    if not rotated:
+        return AuthToken.objects.get(pk=token.pk)
+
+    for field, value in values.items():
+        setattr(token, field, value)
+    return token
@@ -1,12 +1,13 @@
 from django.urls import path
-from .views import AuthUserAPIView, UserRegistrationAPIView, UserLogoutAPIView, UserLoginAPIView, \
-    PasswordResetRequestView, PasswordResetConfirmView, UserProfileView, UpdateUserActiveStatusAPIView, \
-    UserListAPIView, StudentListAPIView
+from .views import AuthUserAsyncAPIView, UserRegistrationAPIView, UserLogoutAPIView, UserLoginAPIView, \
+    PasswordResetRequestView, PasswordResetConfirmView, UserProfileAsyncView, UpdateUserActiveStatusAPIView, \
+    UserListAPIView, StudentListAPIView, UserImportAPIView
 
 urlpatterns = [
-    path('', AuthUserAPIView.as_view(), name='auth_user'),
-    path('profile/', UserProfileView.as_view(), name='user-profile'),
+    path('', AuthUserAsyncAPIView.as_view(), name='auth_user'),
+    path('profile/', UserProfileAsyncView.as_view(), name='user-profile'),
     path('register/', UserRegistrationAPIView.as_view(), name='user_registration'),
+    path('import/', UserImportAPIView.as_view(), name='user_import'),
     path('update-active-status/', UpdateUserActiveStatusAPIView.as_view(), name='update_user_active_status'),
     path('login/', UserLoginAPIView.as_view(), name='user_login'),
     path('logout/', UserLogoutAPIView.as_view(), name='user_logout'),
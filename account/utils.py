@@ -0,0 +1,26 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+_NO_GROUP = object()
+
+
+def stream_grouped_json(rows, fields):
+    """
+    Yield a JSON object of ``{group: [row, ...]}`` built from ``rows`` already ordered by group.
+    Each row is a tuple of the group key followed by the values of ``fields``.
+    """
+    current = _NO_GROUP
+
+    yield '{'
+    for row in rows:
+        group, values = row[0], row[1:]
+        if group != current:
+            key = 'null' if group is None else str(group)
+            prefix = '' if current is _NO_GROUP else '],'
+            prefix += f'{json.dumps(key)}:['
+            current = group
+        else:
+            prefix = ','
+        yield prefix + json.dumps(dict(zip(fields, values)), cls=DjangoJSONEncoder)
+    yield '}' if current is _NO_GROUP else ']}'
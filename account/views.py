@@ -1,23 +1,54 @@
-from collections import defaultdict
+import io
+import os
 
 from django.conf import settings
-from django.core.mail import send_mail
 from django.db import transaction
-from rest_framework.authtoken.models import Token
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 from rest_framework.generics import CreateAPIView
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
 
-from account.models import User, PasswordReset, StudentProfile, TeacherProfile
+from account.authentication import get_token_cache
+from account.hashers import HashingSlotTimeout, hashing_queue_timeout
+from account.importer import read_rows, import_users
+from account.mail import queue_mail
+from account.tokens import get_token
+from account.pagination import UserPagination
+from account.models import User, PasswordReset, StudentProfile, TeacherProfile, AuthToken, generate_reset_code
 from account.permissions import IsAdmin, IsAdminOrTeacher
+from dgc.async_views import AsyncAPIView, APIJSONResponse
+from dgc.db_router import mark_recent_write
 from account.serializers import UserSerializer, PasswordResetRequestSerializer, PasswordResetConfirmSerializer, \
     TokenSerializer, TeacherProfileSerializer, StudentProfileSerializer, UserActiveStatusSerializer
+from account.utils import stream_grouped_json
 
 
-class UserRegistrationAPIView(CreateAPIView):
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many logins at once, try again in a moment.'
+    default_code = 'password_hashing_busy'
+
+
+class HashingQueueTimeoutMixin:
+    """Answers a request that waited ``PASSWORD_HASHING['QUEUE_TIMEOUT']`` seconds for a hashing slot with a 503."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with hashing_queue_timeout(settings.PASSWORD_HASHING['QUEUE_TIMEOUT']):
+            return super().dispatch(request, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, HashingSlotTimeout):
+            exc = PasswordHashingBusy()
+        return super().handle_exception(exc)
+
+
+class UserRegistrationAPIView(HashingQueueTimeoutMixin, CreateAPIView):
     serializer_class = UserSerializer
     queryset = User.objects.all()
 
@@ -27,7 +58,7 @@ class UserRegistrationAPIView(CreateAPIView):
 
         with transaction.atomic():
             user = serializer.save()
-            token = Token.objects.create(user=user)
+            token = AuthToken.objects.create(user=user)
 
             if user.user_type == User.UserType.STUDENT:
                 student_serializer = StudentProfileSerializer(data=request.data)
@@ -58,6 +89,8 @@ class UserRegistrationAPIView(CreateAPIView):
                     updated_by=user
                 )
 
+            # The client reads the new user with this token next, possibly before the replicas have it.
+            mark_recent_write(token.key)
             return Response(
                 data={
                     'token': token.key,
@@ -67,9 +100,46 @@ class UserRegistrationAPIView(CreateAPIView):
             )
 
 
-class UserLoginAPIView(ObtainAuthToken):
+class UserImportAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                data={"error": "A CSV or JSONL file is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        file_format = request.data.get('format') or os.path.splitext(upload.name)[1].lstrip('.').lower()
+        if file_format not in ('csv', 'jsonl'):
+            return Response(
+                data={"error": "Only CSV or JSONL files are allowed."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Rows the decoder stops at (not UTF-8) are reported like the other row errors.
+        file = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        report = import_users(
+            read_rows(file, file_format),
+            activate=request.data.get('activate') in ('1', 'true', 'True'),
+            processes=settings.USER_IMPORT['PROCESSES'],
+            max_rows=settings.USER_IMPORT['MAX_ROWS'],
+        )
+
+        return Response(data=report, status=status.HTTP_200_OK)
+
+
+class UserLoginAPIView(HashingQueueTimeoutMixin, ObtainAuthToken):
     serializer_class = TokenSerializer
 
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = get_token(serializer.validated_data['user'], serializer.validated_data.get('client'))
+        return Response({'token': token.key, 'expires_at': token.expires_at})
+
 
 class AuthUserAPIView(APIView):
     permission_classes = (IsAuthenticated,)
@@ -80,12 +150,21 @@ class AuthUserAPIView(APIView):
         return Response(serializer.data)
 
 
+class AuthUserAsyncAPIView(AsyncAPIView):
+    view_class = AuthUserAPIView
+
+    async def get(self, request):
+        serializer = UserSerializer(request.user)
+        return APIJSONResponse(serializer.data)
+
+
 class UserLogoutAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        # Delete user token
-        request.user.auth_token.delete()
+        # Delete the token of this client, other clients of the user stay logged in
+        get_token_cache().delete(request.auth.key)
+        request.auth.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -101,24 +180,23 @@ class PasswordResetRequestView(APIView):
             # Create or update reset code for the user
             reset_code, created = PasswordReset.objects.get_or_create(user=user)
             if not created:
-                reset_code.code = reset_code.generate_reset_code()
+                reset_code.code = generate_reset_code()
                 reset_code.is_used = False
                 reset_code.save()
 
-            # Send the reset code via email
-            send_mail(
+            # Queue the reset code email, it is sent by the send_queued_emails worker
+            queue_mail(
                 'Password Reset Code',
                 f'Your password reset code is {reset_code.code}',
                 settings.DEFAULT_FROM_EMAIL,
                 [email],
-                fail_silently=False,
             )
 
             return Response({"message": "Password reset code sent to email."}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PasswordResetConfirmView(APIView):
+class PasswordResetConfirmView(HashingQueueTimeoutMixin, APIView):
     def post(self, request):
         serializer = PasswordResetConfirmSerializer(data=request.data)
         if serializer.is_valid():
@@ -128,6 +206,7 @@ class PasswordResetConfirmView(APIView):
 
             user.set_password(new_password)
             user.save()
+            get_token_cache().delete_user(user)
 
             # Mark the reset code as used
             reset_code.is_used = True
@@ -137,30 +216,38 @@ class PasswordResetConfirmView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserProfileView(APIView):
-    permission_classes = [IsAuthenticated]
+# Profile model, serializer and missing profile error of the user types that have a profile.
+PROFILE_TYPES = {
+    User.UserType.TEACHER: (TeacherProfile, TeacherProfileSerializer, "Teacher profile not found."),
+    User.UserType.STUDENT: (StudentProfile, StudentProfileSerializer, "Student profile not found."),
+}
 
-    def get(self, request):
-        user = request.user
 
-        if user.user_type == User.UserType.TEACHER:
-            try:
-                profile = TeacherProfile.objects.get(user=user)
-                serializer = TeacherProfileSerializer(profile)
-            except TeacherProfile.DoesNotExist:
-                return Response({"error": "Teacher profile not found."}, status=status.HTTP_404_NOT_FOUND)
+def get_profile_queryset(user):
+    """The profile of ``user``, None for the user types without one."""
+    if user.user_type not in PROFILE_TYPES:
+        return None
+    model, _, _ = PROFILE_TYPES[user.user_type]
+    return model.objects.filter(user=user)
 
-        elif user.user_type == User.UserType.STUDENT:
-            try:
-                profile = StudentProfile.objects.get(user=user)
-                serializer = StudentProfileSerializer(profile)
-            except StudentProfile.DoesNotExist:
-                return Response({"error": "Student profile not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        else:
-            return Response({"error": "Invalid user type."}, status=status.HTTP_400_BAD_REQUEST)
+def get_profile_data(user, profile):
+    """The data and status answering a profile GET of ``user``, ``profile`` is None when it wasn't found."""
+    if user.user_type not in PROFILE_TYPES:
+        return {"error": "Invalid user type."}, status.HTTP_400_BAD_REQUEST
+    _, serializer_class, not_found = PROFILE_TYPES[user.user_type]
+    if profile is None:
+        return {"error": not_found}, status.HTTP_404_NOT_FOUND
+    return serializer_class(profile).data, status.HTTP_200_OK
+
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+class UserProfileView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        queryset = get_profile_queryset(request.user)
+        profile = queryset.first() if queryset is not None else None
+        return Response(*get_profile_data(request.user, profile))
 
     def patch(self, request):
         user = request.user
@@ -199,6 +286,15 @@ class UserProfileView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class UserProfileAsyncView(AsyncAPIView):
+    view_class = UserProfileView
+
+    async def get(self, request):
+        queryset = get_profile_queryset(request.user)
+        profile = await queryset.afirst() if queryset is not None else None
+        return APIJSONResponse(*get_profile_data(request.user, profile))
+
+
 class UpdateUserActiveStatusAPIView(APIView):
     permission_classes = [IsAuthenticated, IsAdmin]
     serializer_class = UserActiveStatusSerializer
@@ -213,6 +309,8 @@ class UpdateUserActiveStatusAPIView(APIView):
             user = User.objects.get(id=request.data.get('user_id'))
             user.is_active = serializer.validated_data.get('is_active')
             user.save()
+            if not user.is_active:
+                get_token_cache().delete_user(user)
 
             message = 'User status has been changed to active'
         except User.DoesNotExist:
@@ -229,29 +327,81 @@ class UpdateUserActiveStatusAPIView(APIView):
 
 
 class UserListAPIView(APIView):
+    """
+    Page of the non-admin users, newest first, for the registration approvals. Filtered with ``?type=``,
+    ``?is_active=`` and ``?q=`` (every word in the name or email), ``?profile=1`` embeds each user's student or
+    teacher profile through a join of the same query.
+    """
     permission_classes = [IsAuthenticated, IsAdmin]
     serializer_class = UserSerializer
+    pagination_class = UserPagination
+    profiles = {
+        User.UserType.STUDENT: ('student_profile', StudentProfileSerializer.Meta.fields),
+        User.UserType.TEACHER: ('teacher_profile', TeacherProfileSerializer.Meta.fields),
+    }
 
     def get(self, request, **kwargs):
         users = User.objects.exclude(user_type=User.UserType.ADMIN)
         if request.GET.get('type') and request.GET.get('type') in [User.UserType.STUDENT, User.UserType.TEACHER]:
             users = users.filter(user_type=request.GET.get('type'))
-        users = users.all()
 
-        serializer = self.serializer_class(users, many=True)
-
-        return Response(data=serializer.data)
+        is_active = request.GET.get('is_active', '').lower()
+        if is_active:
+            if is_active not in ('true', 'false', '1', '0'):
+                return Response(
+                    data={"error": "is_active must be true or false."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            users = users.filter(is_active=is_active in ('true', '1'))
+
+        for word in request.GET.get('q', '').split():
+            users = users.filter(Q(name__icontains=word) | Q(email__icontains=word))
+
+        fields = [field for field in self.serializer_class.Meta.fields if field != 'password']
+        with_profile = request.GET.get('profile', '').lower() in ('true', '1')
+        columns = list(fields)
+        if with_profile:
+            columns += [f'{relation}__{field}' for relation, profile_fields in self.profiles.values()
+                        for field in profile_fields]
+
+        # The count runs on the filtered users alone, the profile joins only on the rows of the page.
+        paginator = self.pagination_class()
+        paginator.count_queryset = users
+        rows = paginator.paginate_queryset(users.order_by('-date_joined', '-id').values(*columns), request, view=self)
+        if with_profile:
+            rows = [self.embed_profile(row, fields) for row in rows]
+        return paginator.get_paginated_response(rows)
+
+    def embed_profile(self, row, fields):
+        user = {field: row[field] for field in fields}
+        user['profile'] = None
+        if row['user_type'] in self.profiles:
+            relation, profile_fields = self.profiles[row['user_type']]
+            profile = {field: row[f'{relation}__{field}'] for field in profile_fields}
+            # A user without a profile row gets nulls from the left join.
+            if any(value is not None for value in profile.values()):
+                user['profile'] = profile
+        return user
 
 
 class StudentListAPIView(APIView):
     serializer_class = StudentProfileSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTeacher]
+    filter_fields = ('semester', 'department', 'section')
+    chunk_size = 2000
 
     def get(self, request, **kwargs):
-        students = StudentProfile.objects.order_by('roll').all()
-
-        semester_students = defaultdict(list)
-        for student in students:
-            semester_students[student.semester].append(self.serializer_class(student).data)
-
-        return Response(semester_students)
+        students = StudentProfile.objects.order_by('semester', 'roll')
+        for field in self.filter_fields:
+            if request.GET.get(field):
+                students = students.filter(**{field: request.GET.get(field)})
+
+        # Only the serialized columns are fetched, grouped by semester through the ordering
+        # and written out row by row, so memory does not grow with the number of students.
+        fields = self.serializer_class.Meta.fields
+        rows = students.values_list('semester', *fields).iterator(chunk_size=self.chunk_size)
+
+        return StreamingHttpResponse(
+            stream_grouped_json(rows, fields),
+            content_type='application/json'
+        )
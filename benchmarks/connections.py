@@ -0,0 +1,76 @@
+"""
+Per request latency of a few cheap endpoints, where opening the database connection is most of the cost, with a
+new connection per request, persistent connections and the psycopg connection pool.
+
+    BENCHMARK_DB=postgres python -m benchmarks.connections [--requests 500] [--handler wsgi]
+
+Every mode is a ``benchmarks.run`` process with the ``DB_POOL``/``DB_CONN_MAX_AGE`` settings of the mode, on the same
+seeded database (the first run seeds it, the others reuse it). Needs PostgreSQL, SQLite connections are only a file
+open and the pool is PostgreSQL only.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+MODES = {
+    'no_persistence': {'DB_POOL': '0', 'DB_CONN_MAX_AGE': '0'},
+    'persistent': {'DB_POOL': '0', 'DB_CONN_MAX_AGE': '600'},
+    'pool': {'DB_POOL': '1'},
+}
+
+ENDPOINTS = ['user_profile', 'notice', 'class', 'assignment']
+
+
+def run_mode(name, options, output):
+    env = {**os.environ, **MODES[name]}
+    command = [
+        sys.executable, '-m', 'benchmarks.run', '--keepdb', '--output', output,
+        '--handler', options.handler, '--requests', str(options.requests), '--only', *options.only,
+        '--students', str(options.students), '--classes', str(options.classes),
+        '--assignments', str(options.assignments),
+    ]
+    print(f'{name}: {" ".join(f"{key}={value}" for key, value in MODES[name].items())}', file=sys.stderr)
+    subprocess.run(command, env=env, check=True)
+    with open(output) as file:
+        return json.load(file)['endpoints']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the database connection settings.')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+    parser.add_argument('--handler', choices=('asgi', 'wsgi'), default='wsgi')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and mode.')
+    parser.add_argument('--only', nargs='*', default=ENDPOINTS, help='Endpoints to run (default: %(default)s).')
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--classes', type=int, default=500)
+    parser.add_argument('--assignments', type=int, default=5000)
+    options = parser.parse_args(argv)
+
+    if os.getenv('BENCHMARK_DB', 'sqlite') != 'postgres':
+        parser.error('connection settings only matter on PostgreSQL, set BENCHMARK_DB=postgres')
+
+    report = {'meta': {'handler': options.handler, 'requests': options.requests}, 'modes': {}}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in MODES:
+            report['modes'][name] = run_mode(name, options, os.path.join(directory, f'{name}.json'))
+
+    print(f'{"endpoint":<16}' + ''.join(f'{name + " p50/p95":>28}' for name in MODES), file=sys.stderr)
+    for endpoint in options.only:
+        row = (f'{report["modes"][name][endpoint]["p50_ms"]}/{report["modes"][name][endpoint]["p95_ms"]}'
+               for name in MODES)
+        print(f'{endpoint:<16}' + ''.join(f'{cell:>28}' for cell in row), file=sys.stderr)
+
+    content = json.dumps(report, indent=2, sort_keys=True) + '\n'
+    if options.output:
+        with open(options.output, 'w') as file:
+            file.write(content)
+    else:
+        sys.stdout.write(content)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Password checks per second of every configured hasher, the CPU bound part of a login.
+
+    python -m benchmarks.hashing [--threads 4] [--seconds 5]
+
+With one thread the numbers are logins/sec per core. With more threads the checks go through the worker's hashing
+slots (``PASSWORD_HASHING['MAX_CONCURRENCY']``), as concurrent logins do.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.hashers import get_hashers  # noqa: E402
+
+
+def measure(hasher, encoded, seconds, threads):
+    checks = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def check(index):
+        while time.perf_counter() < deadline:
+            hasher.verify('benchmark-password', encoded)
+            checks[index] += 1
+
+    workers = [threading.Thread(target=check, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'logins_per_second': round(sum(checks) / elapsed, 1),
+        'ms_per_login': round(elapsed * threads / sum(checks) * 1000, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the password hashers.')
+    parser.add_argument('--seconds', type=float, default=5, help='Duration per hasher.')
+    parser.add_argument('--threads', type=int, default=1)
+    options = parser.parse_args(argv)
+
+    report = {
+        'meta': {
+            'threads': options.threads,
+            'max_concurrency': settings.PASSWORD_HASHING['MAX_CONCURRENCY'],
+            'cpus': os.cpu_count(),
+        },
+        'hashers': {},
+    }
+    for hasher in get_hashers():
+        try:
+            encoded = hasher.encode('benchmark-password', hasher.salt())
+        except ValueError as e:
+            # The library of the algorithm (argon2-cffi) is not installed.
+            print(f'{hasher.algorithm}: {e}', file=sys.stderr)
+            continue
+        report['hashers'][hasher.algorithm] = measure(hasher, encoded, options.seconds, options.threads)
+        print(f'{hasher.algorithm}: {report["hashers"][hasher.algorithm]}', file=sys.stderr)
+
+    sys.stdout.write(json.dumps(report, indent=2, sort_keys=True) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Benchmark of the API endpoints against a seeded database.
+
+    python -m benchmarks.run --output report.json [--baseline previous.json]
+
+Runs on SQLite by default, ``BENCHMARK_DB=postgres`` uses the ``DB_*`` settings (on a ``test_`` database). Requests
+go through Django's test client in process, so the numbers are the view, ORM and database cost without any network
+or server overhead.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import sys
+import time
+import warnings
+from dataclasses import dataclass, field
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import AsyncClient, Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from account.models import User  # noqa: E402
+from account.tokens import get_token  # noqa: E402
+from benchmarks.seed import PASSWORD, seed  # noqa: E402
+from classroom.models import Routine, Notice, Class, Assignment  # noqa: E402
+from dgc.metrics import QueryStats, current_query_stats, enable_query_recording  # noqa: E402
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    role: str = None
+    method: str = 'get'
+    data: dict = field(default_factory=dict)
+    # Caps the repetitions of expensive endpoints (full lists, password hashing).
+    max_requests: int = None
+
+
+def get_scenarios(users):
+    semester = users['student'].student_profile.semester
+    routine = Routine.objects.latest('id').pk
+    notice = Notice.objects.latest('id').pk
+    lecture = Class.objects.latest('id').pk
+    assignment = Assignment.objects.latest('id').pk
+    return [
+        Scenario('auth_user', '/api/account/', 'student'),
+        Scenario('user_profile', '/api/account/profile/', 'student'),
+        Scenario('user_login', '/api/account/login/', method='post', max_requests=10,
+                 data={'email': users['student'].email, 'password': PASSWORD}),
+        Scenario('user_list', '/api/account/user-list/', 'admin', max_requests=5),
+        Scenario('student_list', '/api/account/student-list/', 'teacher', max_requests=5),
+        Scenario('student_list_semester', '/api/account/student-list/', 'teacher', data={'semester': semester},
+                 max_requests=20),
+        Scenario('routines', '/api/routines/', 'student'),
+        Scenario('routine', f'/api/routines/{routine}/', 'student'),
+        Scenario('notices', '/api/notices/', 'student'),
+        Scenario('notice', f'/api/notices/{notice}/', 'student'),
+        Scenario('classes', '/api/classes/', 'student'),
+        Scenario('classes_semester', '/api/classes/', 'student', data={'semester': semester}),
+        Scenario('class', f'/api/classes/{lecture}/', 'student'),
+        Scenario('assignments', '/api/assignments/', 'student'),
+        Scenario('assignments_fields', '/api/assignments/', 'student', data={'fields': 'id,title'}),
+        Scenario('assignments_search', '/api/assignments/', 'student', data={'q': 'assignment 42'}),
+        Scenario('assignment', f'/api/assignments/{assignment}/', 'student'),
+        Scenario('feed', '/api/feed/', 'student'),
+    ]
+
+
+def percentile(ordered, value):
+    """Nearest rank percentile of an already sorted list."""
+    return ordered[max(math.ceil(value / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(latencies, queries, elapsed, status):
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'status': status,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+        'throughput_rps': round(len(ordered) / elapsed, 1),
+        'queries': max(queries),
+    }
+
+
+async def read_async(response):
+    if not response.streaming:
+        return response.content
+    with warnings.catch_warnings():
+        # Synchronous iterators (the student list) are consumed in a thread, which is what ASGI servers do too.
+        warnings.simplefilter('ignore')
+        return b''.join([chunk async for chunk in response])
+
+
+def read_sync(response):
+    if not response.streaming:
+        return response.content
+    return b''.join(response.streaming_content)
+
+
+async def run_async(client, scenario, headers, count):
+    request = getattr(client, scenario.method)
+    latencies, queries = [], []
+    start = time.perf_counter()
+    for _ in range(count):
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        began = time.perf_counter()
+        try:
+            response = await request(scenario.path, scenario.data, headers=headers)
+            await read_async(response)
+        finally:
+            current_query_stats.reset(token)
+        latencies.append(time.perf_counter() - began)
+        queries.append(stats.count)
+    return latencies, queries, time.perf_counter() - start, response.status_code
+
+
+def run_sync(client, scenario, headers, count):
+    request = getattr(client, scenario.method)
+    latencies, queries = [], []
+    start = time.perf_counter()
+    for _ in range(count):
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        began = time.perf_counter()
+        try:
+            response = request(scenario.path, scenario.data, headers=headers)
+            read_sync(response)
+        finally:
+            current_query_stats.reset(token)
+        latencies.append(time.perf_counter() - began)
+        queries.append(stats.count)
+    return latencies, queries, time.perf_counter() - start, response.status_code
+
+
+def run_scenario(scenario, tokens, options):
+    headers = {'Authorization': f'Token {tokens[scenario.role]}'} if scenario.role else {}
+    count = min(options.requests, scenario.max_requests or options.requests)
+    warmup = min(options.warmup, count)
+
+    if options.handler == 'asgi':
+        client = AsyncClient()
+        asyncio.run(run_async(client, scenario, headers, warmup))
+        latencies, queries, elapsed, status = asyncio.run(run_async(client, scenario, headers, count))
+    else:
+        client = Client()
+        run_sync(client, scenario, headers, warmup)
+        latencies, queries, elapsed, status = run_sync(client, scenario, headers, count)
+    return summarize(latencies, queries, elapsed, status)
+
+
+def get_seeded_users(options):
+    users = {
+        'admin': User.objects.filter(user_type=User.UserType.ADMIN).first(),
+        'teacher': User.objects.filter(user_type=User.UserType.TEACHER).order_by('id').first(),
+        'student': User.objects.filter(user_type=User.UserType.STUDENT).order_by('id').first(),
+    }
+    if None in users.values():
+        return seed(
+            students=options.students, classes=options.classes, assignments=options.assignments,
+            teachers=options.teachers, notices=options.notices,
+        )
+    tokens = {role: get_token(user).key for role, user in users.items()}
+    return users, tokens
+
+
+def compare(report, baseline, tolerance):
+    """Print the change against ``baseline`` and return the endpoints that got slower or issue more queries."""
+    regressions = []
+    print(f'{"endpoint":<24}{"p95 ms":>20}{"queries":>14}', file=sys.stderr)
+    for name, result in report['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            print(f'{name:<24}{result["p95_ms"]:>20}{result["queries"]:>14}', file=sys.stderr)
+            continue
+        print(f'{name:<24}{previous["p95_ms"]:>9} -> {result["p95_ms"]:>7}'
+              f'{previous["queries"]:>6} -> {result["queries"]:>4}', file=sys.stderr)
+        if result['queries'] > previous['queries'] or result['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the API endpoints against a seeded database.')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+    parser.add_argument('--baseline', help='Previous report to compare against, exits with 1 on regressions.')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed p95 increase against the baseline as a fraction (default 0.25).')
+    parser.add_argument('--handler', choices=('asgi', 'wsgi'), default='asgi')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint.')
+    parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per endpoint.')
+    parser.add_argument('--only', nargs='*', help='Only run these endpoints.')
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--teachers', type=int, default=200)
+    parser.add_argument('--classes', type=int, default=5000)
+    parser.add_argument('--assignments', type=int, default=50000)
+    parser.add_argument('--notices', type=int, default=500)
+    parser.add_argument('--keepdb', action='store_true', help='Reuse the seeded database of a previous run.')
+    options = parser.parse_args(argv)
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    if options.keepdb and connection.vendor == 'sqlite':
+        # A file the seeded data is kept in for the next run, SQLite test databases are in memory otherwise.
+        connection.settings_dict['TEST']['NAME'] = os.path.join(settings.BASE_DIR, 'benchmark_test.sqlite3')
+    connection.creation.create_test_db(verbosity=0, keepdb=options.keepdb)
+    enable_query_recording()
+    try:
+        users, tokens = get_seeded_users(options)
+        report = {
+            'meta': {
+                'database': connection.vendor,
+                'handler': options.handler,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'rows': {
+                    'students': User.objects.filter(user_type=User.UserType.STUDENT).count(),
+                    'classes': Class.objects.count(),
+                    'assignments': Assignment.objects.count(),
+                    'notices': Notice.objects.count(),
+                },
+            },
+            'endpoints': {},
+        }
+        for scenario in get_scenarios(users):
+            if options.only and scenario.name not in options.only:
+                continue
+            report['endpoints'][scenario.name] = run_scenario(scenario, tokens, options)
+            print(f'{scenario.name}: {report["endpoints"][scenario.name]}', file=sys.stderr)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options.keepdb)
+
+    content = json.dumps(report, indent=2, sort_keys=True) + '\n'
+    if options.output:
+        with open(options.output, 'w') as file:
+            file.write(content)
+    else:
+        sys.stdout.write(content)
+
+    if options.baseline:
+        with open(options.baseline) as file:
+            regressions = compare(report, json.load(file), options.tolerance)
+        if regressions:
+            print(f'Regressions: {", ".join(regressions)}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+
+from account.enums import Semester
+from account.models import User, StudentProfile, TeacherProfile, AuthToken
+from classroom.models import Routine, Notice, Class, Assignment
+
+BATCH_SIZE = 2000
+PASSWORD = 'benchmark-password'
+
+
+def seed(students=20000, teachers=200, classes=5000, assignments=50000, notices=500, routines=40, seed_value=0):
+    """
+    Insert a realistic data set and return the users the benchmark authenticates as.
+    Every user shares one password hash, so seeding does not spend minutes hashing.
+    """
+    rng = random.Random(seed_value)
+    password = make_password(PASSWORD)
+    semesters = Semester.values
+    departments = ['CSE', 'EEE', 'CE', 'ME', 'BBA']
+
+    admin = User.objects.create(email='admin@benchmark.local', name='Admin', user_type=User.UserType.ADMIN,
+                                password=password)
+
+    teacher_users = User.objects.bulk_create(
+        (User(email=f'teacher{i}@benchmark.local', name=f'Teacher {i}', user_type=User.UserType.TEACHER,
+              password=password) for i in range(teachers)),
+        batch_size=BATCH_SIZE,
+    )
+    TeacherProfile.objects.bulk_create(
+        (TeacherProfile(user=user, name=user.name, email=user.email, department=rng.choice(departments),
+                        designation='Lecturer') for user in teacher_users),
+        batch_size=BATCH_SIZE,
+    )
+
+    student_users = User.objects.bulk_create(
+        (User(email=f'student{i}@benchmark.local', name=f'Student {i}', password=password)
+         for i in range(students)),
+        batch_size=BATCH_SIZE,
+    )
+    StudentProfile.objects.bulk_create(
+        (StudentProfile(user=user, name=user.name, email=user.email, semester=semesters[i % len(semesters)],
+                        department=rng.choice(departments), section=rng.choice('AB'), roll=i,
+                        student_id=f'S{i:06d}') for i, user in enumerate(student_users)),
+        batch_size=BATCH_SIZE,
+    )
+
+    Routine.objects.bulk_create(
+        (Routine(semester=semesters[i % len(semesters)], added_by=admin) for i in range(routines)),
+        batch_size=BATCH_SIZE,
+    )
+    Notice.objects.bulk_create(
+        (Notice(title=f'Notice {i}', added_by=admin) for i in range(notices)),
+        batch_size=BATCH_SIZE,
+    )
+    Class.objects.bulk_create(
+        (Class(title=f'Class {i}', semester=rng.choice(semesters), link=f'https://meet.example.com/{i}',
+               teacher=rng.choice(teacher_users)) for i in range(classes)),
+        batch_size=BATCH_SIZE,
+    )
+    Assignment.objects.bulk_create(
+        (Assignment(title=f'Assignment {i}', semester=rng.choice(semesters), content='Lorem ipsum ' * 50,
+                    teacher=rng.choice(teacher_users)) for i in range(assignments)),
+        batch_size=BATCH_SIZE,
+    )
+
+    users = {'admin': admin, 'teacher': teacher_users[0], 'student': student_users[0]}
+    tokens = {role: AuthToken.objects.create(user=user).key for role, user in users.items()}
+    return users, tokens
@@ -0,0 +1,19 @@
+"""
+Settings for the benchmarks, the project settings with an SQLite database unless BENCHMARK_DB=postgres,
+in which case the DB_* variables of the project settings are used.
+"""
+import os
+
+from dgc.settings import *  # noqa: F401,F403
+
+if os.getenv('BENCHMARK_DB', 'sqlite') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'benchmark.sqlite3'),  # noqa: F405
+        }
+    }
+    # The test database is in memory, benchmarks.run --keepdb keeps it in a file of its own instead.
+    DATABASE_REPLICATION = {**DATABASE_REPLICATION, 'REPLICAS': []}  # noqa: F405
+
+DEBUG = False
@@ -0,0 +1,116 @@
+import os
+import zipfile
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from classroom.models import Submission
+
+# Already compressed, deflating them again costs CPU for nothing.
+STORED_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.mp4', '.mov', '.mkv', '.webm', '.zip')
+
+
+class ZipOutput:
+    """
+    Write-only, unseekable file the archive is written to. ``zipfile`` then puts the sizes and CRC of every entry
+    after its data, so nothing has to be rewritten, and :func:`stream_zip` drains what was written after each write.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        if self.chunks:
+            data = b''.join(self.chunks)
+            self.chunks.clear()
+            yield data
+
+
+def get_zip_info(name, modified):
+    info = zipfile.ZipInfo(name, date_time=timezone.localtime(modified).timetuple()[:6])
+    if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS:
+        info.compress_type = zipfile.ZIP_STORED
+    else:
+        info.compress_type = zipfile.ZIP_DEFLATED
+    return info
+
+
+def stream_zip(entries, chunk_size=512 * 1024):
+    """
+    Yield a ZIP archive of ``entries``, ``(name, modified, content)`` with ``content`` the bytes or the stored
+    ``FieldFile`` of the entry, as it is written. Files are read ``chunk_size`` bytes at a time, so neither memory
+    nor disk use depend on their size, and the first bytes are sent before the first file was read.
+    """
+    output = ZipOutput()
+    with zipfile.ZipFile(output, 'w') as archive:
+        for name, modified, content in entries:
+            info = get_zip_info(name, modified)
+            if isinstance(content, bytes):
+                info.file_size = len(content)
+                with archive.open(info, 'w') as entry:
+                    entry.write(content)
+            else:
+                # Sized up front so that files over 4 GB get ZIP64 headers.
+                info.file_size = content.storage.size(content.name)
+                with content.storage.open(content.name, 'rb') as file, archive.open(info, 'w') as entry:
+                    for chunk in file.chunks(chunk_size):
+                        entry.write(chunk)
+                        yield from output.drain()
+            yield from output.drain()
+    yield from output.drain()
+
+
+async def astream_zip(entries, chunk_size=512 * 1024):
+    """:func:`stream_zip` for ASGI, where Django would collect a sync iterator into a list before sending it."""
+    chunks = stream_zip(entries, chunk_size)
+    done = object()
+    try:
+        while (chunk := await sync_to_async(next)(chunks, done)) is not done:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def get_file_entry_name(instance, default_stem):
+    """The name ``instance``'s file was uploaded with, ``default_stem`` and its extension if it wasn't recorded."""
+    return instance.file_name or default_stem + os.path.splitext(instance.file.name)[1]
+
+
+def get_assignment_entries(assignment):
+    """
+    The assignment's text and file, then every submission's in a directory named after the student's email. Files
+    keep the name they were uploaded with.
+    """
+    entries = []
+    if assignment.content:
+        entries.append(('assignment.txt', assignment.created_at, assignment.content.encode()))
+    if assignment.file:
+        entries.append((get_file_entry_name(assignment, 'assignment'), assignment.created_at, assignment.file))
+
+    submissions = (
+        Submission.objects
+        .filter(assignment=assignment)
+        .select_related('student')
+        .only('file', 'file_name', 'text', 'submitted_at', 'student__email')
+        .order_by('student__email')
+    )
+    for submission in submissions:
+        directory = f'submissions/{submission.student.email}/'
+        if submission.text:
+            entries.append((directory + 'submission.txt', submission.submitted_at, submission.text.encode()))
+        if submission.file:
+            entries.append((directory + get_file_entry_name(submission, 'submission'), submission.submitted_at,
+                            submission.file))
+    return entries
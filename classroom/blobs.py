@@ -0,0 +1,97 @@
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from classroom.models import Routine, Notice, Class, Assignment, Submission, Blob
+from classroom.storage import BLOB_PREFIX, get_blob_storage
+
+BLOB_MODELS = (Routine, Notice, Class, Assignment, Submission)
+
+
+def reserve_blob(name):
+    """
+    Count a pending reference to ``name`` when it is saved, before the storage reuses the file. Until add_reference()
+    counts the row using it, remove_reference() keeps the file and a deletion waiting to run keeps it too.
+    """
+    while not Blob.objects.filter(name=name).update(pending=F('pending') + 1):
+        Blob.objects.bulk_create([Blob(name=name)], ignore_conflicts=True)
+
+
+def add_reference(name):
+    """Count one more row using the stored file ``name``."""
+    if not name.startswith(BLOB_PREFIX):
+        return
+    while not Blob.objects.filter(name=name).update(references=F('references') + 1,
+                                                     pending=Greatest(F('pending') - 1, 0)):
+        # New content. Ignoring conflicts keeps a concurrent upload of the same content from failing the transaction,
+        # the loop covers the row being deleted by a concurrent remove_reference() before it was counted.
+        Blob.objects.bulk_create([Blob(name=name, references=0)], ignore_conflicts=True)
+
+
+def remove_reference(name):
+    """Count one row less using ``name`` and delete the file, once the transaction commits, if it was the last."""
+    if not name.startswith(BLOB_PREFIX):
+        return
+    # Rows at 0 are being counted by add_reference(), only the row of the last reference is deleted.
+    if Blob.objects.filter(name=name, references=1, pending=0).delete()[0]:
+        transaction.on_commit(lambda: delete_unused_file(name))
+    else:
+        Blob.objects.filter(name=name, references__gt=0).update(references=F('references') - 1)
+
+
+def delete_unused_file(name):
+    """Delete the stored file ``name`` whose row was deleted, unless it was saved again since."""
+    try:
+        with transaction.atomic():
+            # The new row locks the name: a reserve_blob() of the same content either created it first, and the file
+            # is kept, or waits for this transaction and stores the file again.
+            Blob.objects.create(name=name)
+            get_blob_storage().delete(name)
+            Blob.objects.filter(name=name).delete()
+    except IntegrityError:
+        pass
+
+
+def iter_blob_names(storage):
+    if not storage.exists(BLOB_PREFIX):
+        return
+    directories, _ = storage.listdir(BLOB_PREFIX)
+    for directory in directories:
+        if directory == '.tmp':
+            continue
+        for name in storage.listdir(f'{BLOB_PREFIX}{directory}')[1]:
+            yield f'{BLOB_PREFIX}{directory}/{name}'
+
+
+def collect_blobs(min_age=3600):
+    """
+    Recount the references of every blob from the rows and delete the stored files nothing uses, e.g. after rows
+    were changed without signals (bulk operations) or a save failed after its file was stored and left its pending
+    reference. Files younger than
+    ``min_age`` seconds are kept, their row may not be saved yet. Returns the names of the deleted files.
+    """
+    counts = {}
+    for model in BLOB_MODELS:
+        for name in model.objects.exclude(file='').exclude(file__isnull=True).values_list('file', flat=True).iterator():
+            if name.startswith(BLOB_PREFIX):
+                counts[name] = counts.get(name, 0) + 1
+
+    with transaction.atomic():
+        for blob in Blob.objects.select_for_update():
+            references = counts.pop(blob.name, 0)
+            if references != blob.references or blob.pending:
+                Blob.objects.filter(pk=blob.pk).update(references=references, pending=0)
+        Blob.objects.bulk_create(Blob(name=name, references=references) for name, references in counts.items())
+        Blob.objects.filter(references=0).delete()
+
+    storage = get_blob_storage()
+    referenced = set(Blob.objects.values_list('name', flat=True))
+    cutoff = time.time() - min_age
+    deleted = []
+    for name in iter_blob_names(storage):
+        if name not in referenced and storage.get_modified_time(name).timestamp() < cutoff:
+            storage.delete(name)
+            deleted.append(name)
+    return deleted
@@ -0,0 +1,64 @@
+from django.db.models import Q
+
+from classroom.models import Routine, Notice, Class, Assignment, FeedSection
+from classroom.serializers import RoutineSerializer, NoticeSerializer, ClassSerializer, AssignmentSerializer
+
+# name: (model, serializer, number of items, whether the section is per semester)
+FEED_SECTIONS = {
+    'routine': (Routine, RoutineSerializer, 1, True),
+    'classes': (Class, ClassSerializer, 10, True),
+    'assignments': (Assignment, AssignmentSerializer, 10, True),
+    'notices': (Notice, NoticeSerializer, 10, False),
+}
+
+
+def get_section_semester(name, semester):
+    return semester if FEED_SECTIONS[name][3] else ''
+
+
+def build_section(name, semester):
+    """Rebuild and store one feed section, ``semester`` is ignored for sections shared by all semesters."""
+    model, serializer_class, limit, per_semester = FEED_SECTIONS[name]
+    queryset = model.objects.order_by('-created_at', '-id')
+    if per_semester:
+        queryset = queryset.filter(semester=semester)
+
+    section, _ = FeedSection.objects.update_or_create(
+        name=name,
+        semester=get_section_semester(name, semester),
+        defaults={'data': serializer_class(queryset[:limit], many=True).data},
+    )
+    return section
+
+
+def get_absolute_items(items, request):
+    """
+    Sections are stored without a request, so with their ``file`` and ``file_url`` relative, made absolute like the
+    list endpoints return them.
+    """
+    return [
+        {**item, **{key: request.build_absolute_uri(item[key]) for key in ('file', 'file_url') if item.get(key)}}
+        for item in items
+    ]
+
+
+def get_feed(semester, request):
+    """Return the feed of ``semester`` from its stored sections, building the missing ones."""
+    sections = {
+        section.name: section
+        for section in FeedSection.objects.filter(Q(semester=semester) | Q(semester=''))
+        if section.name in FEED_SECTIONS and section.semester == get_section_semester(section.name, semester)
+    }
+    for name in FEED_SECTIONS:
+        if name not in sections:
+            sections[name] = build_section(name, semester)
+
+    routine = get_absolute_items(sections['routine'].data, request)
+    return {
+        'semester': semester,
+        'routine': routine[0] if routine else None,
+        'classes': get_absolute_items(sections['classes'].data, request),
+        'assignments': get_absolute_items(sections['assignments'].data, request),
+        'notices': get_absolute_items(sections['notices'].data, request),
+        'updated_at': max(section.updated_at for section in sections.values()),
+    }
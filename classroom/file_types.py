@@ -0,0 +1,63 @@
+"""
+Types of the uploaded files told from their first bytes, a file's extension says nothing about its content.
+"""
+
+# Bytes read to recognize a file, the Matroska doc type (mkv or webm) is the furthest from the start.
+HEADER_SIZE = 64
+
+DOCUMENT_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png')
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.mkv', '.webm')
+
+DOCUMENT_TYPES = ('pdf', 'jpeg', 'png')
+VIDEO_TYPES = ('mp4', 'mov', 'mkv', 'webm')
+
+# Brands of MP4 videos, the major brand of the ftyp box or one of its compatible brands.
+MP4_BRANDS = (b'isom', b'iso2', b'mp41', b'mp42', b'avc1', b'dash', b'M4V ')
+
+# Major brands of images and audio stored in the same boxes (HEIF, AVIF, M4A, ...), which list MP4 brands as
+# compatible too. 3GPP brands all start with 3g.
+OTHER_ISO_BRANDS = (b'heic', b'heix', b'hevc', b'heim', b'heis', b'mif1', b'msf1', b'avif', b'avis', b'M4A ', b'M4B ',
+                    b'M4P ', b'F4A ', b'F4B ')
+
+# Top level QuickTime atoms that old MOV files start with instead of ftyp.
+QUICKTIME_ATOMS = (b'moov', b'mdat', b'wide', b'free', b'skip')
+
+
+def get_file_type(header):
+    """Return the type of a file from its first ``HEADER_SIZE`` bytes, None when it is none of the known ones."""
+    if header.startswith(b'%PDF-'):
+        return 'pdf'
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if header[4:8] == b'ftyp':
+        return get_ftyp_type(header)
+    if header[4:8] in QUICKTIME_ATOMS:
+        return 'mov'
+    if header.startswith(b'\x1a\x45\xdf\xa3'):
+        return 'webm' if b'webm' in header else 'mkv'
+    return None
+
+
+def get_ftyp_type(header):
+    """``mov`` or ``mp4`` from the brands of the ftyp box the header starts with, None for other formats."""
+    major_brand = header[8:12]
+    if major_brand == b'qt  ':
+        return 'mov'
+    if major_brand in MP4_BRANDS:
+        return 'mp4'
+    if major_brand in OTHER_ISO_BRANDS or major_brand.startswith(b'3g'):
+        return None
+    # Compatible brands follow the minor version, as far as the box and the header go.
+    end = min(int.from_bytes(header[:4], 'big'), len(header))
+    compatible_brands = {header[i:i + 4] for i in range(16, end - 3, 4)}
+    return 'mp4' if compatible_brands.intersection(MP4_BRANDS) else None
+
+
+def read_header(file):
+    """The first ``HEADER_SIZE`` bytes of a ``File``, which is read again from the start afterwards."""
+    file.seek(0)
+    header = file.read(HEADER_SIZE)
+    file.seek(0)
+    return header
@@ -0,0 +1,96 @@
+import datetime
+from functools import reduce
+from operator import or_
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+# Text search configuration of the search vectors, the GIN indexes are built with the same one.
+SEARCH_CONFIG = 'english'
+
+
+def get_search_vector(*fields):
+    return SearchVector(*fields, config=SEARCH_CONFIG)
+
+
+def parse_created_bound(param, value):
+    """Parse a ``created_after``/``created_before`` value, returns the aware datetime and whether it was a date."""
+    try:
+        day = parse_date(value)
+        bound = datetime.datetime.combine(day, datetime.time.min) if day else parse_datetime(value)
+    except ValueError:
+        bound = None
+    if bound is None:
+        raise ValidationError({param: ['Enter a valid date or date/time.']})
+
+    if timezone.is_naive(bound):
+        bound = timezone.make_aware(bound)
+    return bound, day is not None
+
+
+class FieldFilter(BaseFilterBackend):
+    """
+    Exact matches on the view's ``filter_fields`` (``?semester=5th&teacher=3``) and ``created_at`` ranges with
+    ``?created_after=`` and ``?created_before=`` (both inclusive).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        for field in getattr(view, 'filter_fields', ()):
+            value = request.query_params.get(field)
+            if value:
+                try:
+                    value = queryset.model._meta.get_field(field).to_python(value)
+                except DjangoValidationError as e:
+                    raise ValidationError({field: e.messages})
+                queryset = queryset.filter(**{field: value})
+
+        if request.query_params.get('created_after'):
+            start, _ = parse_created_bound('created_after', request.query_params['created_after'])
+            queryset = queryset.filter(created_at__gte=start)
+        if request.query_params.get('created_before'):
+            end, is_date = parse_created_bound('created_before', request.query_params['created_before'])
+            if is_date:
+                # The whole day, up to the start of the next one.
+                queryset = queryset.filter(created_at__lt=end + datetime.timedelta(days=1))
+            else:
+                queryset = queryset.filter(created_at__lte=end)
+        return queryset
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    ``?q=`` search over the view's ``search_fields``. On PostgreSQL this is a full text search on the same vector as
+    the GIN index of the table, elsewhere (SQLite in tests) every word has to be contained in one of the fields.
+    """
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        fields = getattr(view, 'search_fields', ())
+        if not query or not fields:
+            return queryset
+
+        if connections[queryset.db].vendor == 'postgresql':
+            return queryset.alias(search=get_search_vector(*fields)).filter(
+                search=SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+            )
+
+        for word in query.split():
+            queryset = queryset.filter(reduce(or_, (Q(**{f'{field}__icontains': word}) for field in fields)))
+        return queryset
+
+
+class StableOrderingFilter(OrderingFilter):
+    """``?ordering=`` on the view's ``ordering_fields``, ending with ``id`` so equal values keep their order."""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering = [*ordering, '-id' if ordering[0].startswith('-') else 'id']
+        return ordering
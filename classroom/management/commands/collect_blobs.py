@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from classroom.blobs import collect_blobs
+
+
+class Command(BaseCommand):
+    help = 'Recount the references of the stored files and delete the files no row uses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help='Seconds after which an unreferenced file is deleted.')
+
+    def handle(self, *args, **options):
+        deleted = collect_blobs(min_age=options['min_age'])
+        self.stdout.write(f'Deleted {len(deleted)} unreferenced file(s).')
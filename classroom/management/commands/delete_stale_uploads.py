@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from classroom.models import ChunkedUpload
+from classroom.uploads import delete_partial_file
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable uploads that were not finalized in time, with their partial files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=48, help='Age after which unfinished uploads are deleted.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timezone.timedelta(hours=options['hours'])
+        uploads = ChunkedUpload.objects.filter(completed_at__isnull=True, created_at__lt=cutoff)
+
+        count = 0
+        for upload in uploads.iterator():
+            delete_partial_file(upload)
+            upload.delete()
+            count += 1
+
+        self.stdout.write(f'Deleted {count} stale upload(s).')
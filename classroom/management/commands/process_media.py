@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from classroom.processing import process_queued_media
+
+
+class Command(BaseCommand):
+    help = 'Make the thumbnails, compressed images and video renditions of the uploaded files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help='Number of jobs processed per batch.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for jobs instead of exiting.')
+        parser.add_argument('--sleep', type=float, default=5, help='Seconds to wait when no job is due.')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_queued_media(batch_size=options['batch_size'])
+            if processed:
+                self.stdout.write(f'Processed {processed} file(s).')
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from account.enums import Semester
+from classroom.feed import FEED_SECTIONS, build_section, get_section_semester
+
+
+class Command(BaseCommand):
+    help = 'Rebuild every section of the per-semester feeds, e.g. after bulk changes that skip model signals.'
+
+    def handle(self, *args, **options):
+        built = set()
+        for semester in Semester.values:
+            for name in FEED_SECTIONS:
+                key = (name, get_section_semester(name, semester))
+                if key not in built:
+                    build_section(name, semester)
+                    built.add(key)
+
+        self.stdout.write(f'Rebuilt {len(built)} feed section(s).')
@@ -0,0 +1,144 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_etags, parse_http_date_safe
+
+from classroom.storage import get_blob_digest
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def get_file_etag(size, modified):
+    return f'"{size:x}-{int(modified or 0):x}"'
+
+
+def parse_range(header, size):
+    """
+    Return the ``(start, end)`` byte positions (inclusive) asked for by a single range ``Range`` header,
+    None when the header should be ignored, or ``False`` when the range can not be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        # Multiple or malformed ranges, the whole file is served instead.
+        return None
+
+    start, end = match.groups()
+    if start == '':
+        # Suffix range, the last N bytes.
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_file_range(file, start, length, chunk_size):
+    try:
+        file.seek(start)
+        while length > 0:
+            data = file.read(min(chunk_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+def if_range_matches(if_range, etag, modified):
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Weak validators never match for ranges.
+        return etag in parse_etags(if_range) and not if_range.startswith('W/')
+    since = parse_http_date_safe(if_range)
+    # An exact match, an older date means the client holds another version of the file.
+    return since is not None and modified is not None and int(modified) == since
+
+
+def serve_file(request, field_file, filename=None):
+    """
+    Serve a stored ``FieldFile`` honoring ``Range``/``If-Range`` and ``ETag``/``If-None-Match``, named ``filename``
+    (by default the stored name) for downloads.
+
+    With ``MEDIA_SENDFILE['BACKEND']`` set to ``x-accel-redirect`` or ``x-sendfile`` the body is left to
+    the web server in front of Django, which then also handles ranges itself.
+    """
+    storage, name = field_file.storage, field_file.name
+    size = storage.size(name)
+    try:
+        modified = storage.get_modified_time(name).timestamp()
+    except NotImplementedError:
+        modified = None
+
+    etag = get_file_etag(size, modified)
+    response = get_conditional_response(request, etag=etag, last_modified=modified and int(modified))
+    if response is not None:
+        return response
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    filename = filename or os.path.basename(name)
+    headers = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Content-Disposition': content_disposition_header(False, filename),
+    }
+    if modified:
+        headers['Last-Modified'] = http_date(modified)
+    digest = get_blob_digest(name)
+    if digest and request.GET.get('v') == digest:
+        # The URL names the content (see FileURLMixin), a replaced file is linked with another one.
+        max_age = settings.MEDIA_SENDFILE.get('IMMUTABLE_MAX_AGE', 365 * 24 * 3600)
+        headers['Cache-Control'] = f'private, max-age={max_age}, immutable'
+    else:
+        # The same URL serves the replacement of the file, revalidated with the ETag.
+        headers['Cache-Control'] = 'private, no-cache'
+
+    backend = settings.MEDIA_SENDFILE.get('BACKEND')
+    if backend == 'x-accel-redirect':
+        headers['X-Accel-Redirect'] = settings.MEDIA_SENDFILE['PREFIX'].rstrip('/') + '/' + name
+        return HttpResponse(content_type=content_type, headers=headers)
+    if backend == 'x-sendfile':
+        headers['X-Sendfile'] = storage.path(name)
+        return HttpResponse(content_type=content_type, headers=headers)
+
+    byte_range = None
+    if request.headers.get('Range') and if_range_matches(request.headers.get('If-Range'), etag, modified):
+        byte_range = parse_range(request.headers['Range'], size)
+
+    if byte_range is False:
+        headers['Content-Range'] = f'bytes */{size}'
+        return HttpResponse(status=416, content_type=content_type, headers=headers)
+
+    if request.method == 'HEAD':
+        return HttpResponse(content_type=content_type, headers={**headers, 'Content-Length': str(size)})
+
+    chunk_size = settings.MEDIA_SENDFILE.get('CHUNK_SIZE', FileResponse.block_size)
+    if byte_range is None:
+        response = FileResponse(
+            storage.open(name, 'rb'), filename=filename, content_type=content_type, headers=headers,
+        )
+        response.block_size = chunk_size
+        return response
+
+    start, end = byte_range
+    length = end - start + 1
+    headers.update({
+        'Content-Range': f'bytes {start}-{end}/{size}',
+        'Content-Length': str(length),
+    })
+    return StreamingHttpResponse(
+        iter_file_range(storage.open(name, 'rb'), start, length, chunk_size),
+        status=206,
+        content_type=content_type,
+        headers=headers,
+    )
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['created_at', 'id'], name='assignments_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['semester', 'created_at'], name='assignments_sem_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='class',
+            index=models.Index(fields=['created_at', 'id'], name='classes_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='class',
+            index=models.Index(fields=['semester', 'created_at'], name='classes_sem_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(fields=['created_at', 'id'], name='notices_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='routine',
+            index=models.Index(fields=['created_at', 'id'], name='routines_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='routine',
+            index=models.Index(fields=['semester', 'created_at'], name='routines_sem_created_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0003_chunked_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedSection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20)),
+                ('semester', models.CharField(blank=True, choices=[('1st', 'First Semester'), ('2nd', 'Second Semester'), ('3rd', 'Third Semester'), ('4th', 'Fourth Semester'), ('5th', 'Fifth Semester'), ('6th', 'Sixth Semester'), ('7th', 'Seventh Semester'), ('8th', 'Eighth Semester')], default='', max_length=10)),
+                ('data', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'feed_sections',
+                'constraints': [models.UniqueConstraint(fields=('name', 'semester'), name='feed_sections_name_semester_uniq')],
+            },
+        ),
+    ]
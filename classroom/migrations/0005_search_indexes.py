@@ -0,0 +1,35 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# Expression indexes on the vectors searched by classroom.filters.FullTextSearchFilter (with its SEARCH_CONFIG).
+# PostgreSQL only, so they are created here rather than declared in the models' Meta.
+SEARCH_INDEXES = [
+    ('Assignment', GinIndex(SearchVector('title', 'content', config='english'), name='assignments_search_idx')),
+    ('Class', GinIndex(SearchVector('title', config='english'), name='classes_search_idx')),
+]
+
+
+def add_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in SEARCH_INDEXES:
+        schema_editor.add_index(apps.get_model('classroom', model_name), index)
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in SEARCH_INDEXES:
+        schema_editor.remove_index(apps.get_model('classroom', model_name), index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0004_feed_section'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:03
+
+import classroom.models
+import classroom.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0006_media_processing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('references', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'blobs',
+            },
+        ),
+        migrations.AlterField(
+            model_name='assignment',
+            name='file',
+            field=models.FileField(null=True, storage=classroom.storage.get_blob_storage, upload_to='assignments/', validators=[classroom.models.validate_file_type]),
+        ),
+        migrations.AlterField(
+            model_name='class',
+            name='file',
+            field=models.FileField(null=True, storage=classroom.storage.get_blob_storage, upload_to='classes/', validators=[classroom.models.validate_video_type]),
+        ),
+        migrations.AlterField(
+            model_name='notice',
+            name='file',
+            field=models.FileField(null=True, storage=classroom.storage.get_blob_storage, upload_to='notices/', validators=[classroom.models.validate_file_type]),
+        ),
+        migrations.AlterField(
+            model_name='routine',
+            name='file',
+            field=models.FileField(null=True, storage=classroom.storage.get_blob_storage, upload_to='routines/', validators=[classroom.models.validate_file_type]),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:14
+
+import classroom.models
+import classroom.storage
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0007_content_addressed_files'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Submission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(null=True, storage=classroom.storage.get_blob_storage, upload_to='submissions/', validators=[classroom.models.validate_file_type])),
+                ('text', models.TextField(null=True)),
+                ('submitted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('grade', models.PositiveSmallIntegerField(null=True)),
+                ('feedback', models.TextField(null=True)),
+                ('graded_at', models.DateTimeField(null=True)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='classroom.assignment')),
+                ('graded_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='graded_submissions', to=settings.AUTH_USER_MODEL)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'submissions',
+                'indexes': [models.Index(fields=['assignment', 'submitted_at', 'id'], name='submissions_assign_sub_idx')],
+                'constraints': [models.UniqueConstraint(fields=('assignment', 'student'), name='submissions_assignment_student_uniq')],
+            },
+        ),
+    ]
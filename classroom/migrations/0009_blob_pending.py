@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0008_submissions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='pending',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.2 on 2026-10-18 02:12
+
+import os
+
+import classroom.models
+import classroom.storage
+from django.db import migrations, models
+
+
+def fill_file_names(apps, schema_editor):
+    # Files stored before the content addressed storage still have the name they were uploaded with.
+    for model_name in ('Routine', 'Notice', 'Class', 'Assignment', 'Submission'):
+        model = apps.get_model('classroom', model_name)
+        rows = model.objects.exclude(file='').exclude(file__isnull=True).exclude(file__startswith='blobs/')
+        for row in rows.only('id', 'file').iterator():
+            model.objects.filter(pk=row.pk).update(file_name=os.path.basename(row.file.name)[:255])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0009_blob_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='file_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='class',
+            name='file_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='notice',
+            name='file_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='routine',
+            name='file_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='file_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='assignment',
+            name='file',
+            field=classroom.models.NamedFileField(null=True, storage=classroom.storage.get_blob_storage, upload_to='assignments/', validators=[classroom.models.validate_file_type]),
+        ),
+        migrations.AlterField(
+            model_name='class',
+            name='file',
+            field=classroom.models.NamedFileField(null=True, storage=classroom.storage.get_blob_storage, upload_to='classes/', validators=[classroom.models.validate_video_type]),
+        ),
+        migrations.AlterField(
+            model_name='notice',
+            name='file',
+            field=classroom.models.NamedFileField(null=True, storage=classroom.storage.get_blob_storage, upload_to='notices/', validators=[classroom.models.validate_file_type]),
+        ),
+        migrations.AlterField(
+            model_name='routine',
+            name='file',
+            field=classroom.models.NamedFileField(null=True, storage=classroom.storage.get_blob_storage, upload_to='routines/', validators=[classroom.models.validate_file_type]),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='file',
+            field=classroom.models.NamedFileField(null=True, storage=classroom.storage.get_blob_storage, upload_to='submissions/', validators=[classroom.models.validate_file_type]),
+        ),
+        migrations.RunPython(fill_file_names, migrations.RunPython.noop),
+    ]
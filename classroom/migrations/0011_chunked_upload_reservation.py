@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0010_file_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunkedupload',
+            name='reserved_until',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -1,38 +1,74 @@
 import os
+import uuid
 
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
 
 from account.enums import Semester
 from account.models import User
+from classroom.file_types import DOCUMENT_EXTENSIONS, DOCUMENT_TYPES, VIDEO_EXTENSIONS, VIDEO_TYPES, get_file_type, \
+    read_header
+from classroom.storage import get_blob_storage
 
 
 def validate_file_type(value):
     ext = os.path.splitext(value.name)[1].lower()
-    valid_extensions = ['.pdf', '.jpg', '.jpeg', '.png']
-    if ext not in valid_extensions:
+    if ext not in DOCUMENT_EXTENSIONS:
         raise ValidationError('Only PDF, JPEG, JPG, or PNG files are allowed.')
+    if get_file_type(read_header(value)) not in DOCUMENT_TYPES:
+        raise ValidationError('The file is not a PDF, JPEG or PNG file.')
 
 
-def validate_video_type(value):
-    ext = os.path.splitext(value.name)[1].lower()
-    valid_extensions = ['.mp4', '.mov', '.mkv', '.webm']
-    print(ext)
-    if ext not in valid_extensions:
+def validate_video_extension(name):
+    ext = os.path.splitext(name)[1].lower()
+    if ext not in VIDEO_EXTENSIONS:
         raise ValidationError('Only MP4, MOV, MKV, Webm are allowed.')
 
 
+def validate_video_type(value):
+    validate_video_extension(value.name)
+    if get_file_type(read_header(value)) not in VIDEO_TYPES:
+        raise ValidationError('The file is not an MP4, MOV, MKV or WebM video.')
+
+
+class NamedFieldFile(FieldFile):
+    def save(self, name, content, save=True):
+        setattr(self.instance, self.field.name_attname, os.path.basename(name)[:255])
+        super().save(name, content, save)
+
+
+class NamedFileField(models.FileField):
+    """
+    ``FileField`` keeping the name the file was uploaded with in the ``<name>_name`` field, which the model declares
+    after it. The storage names files after their content.
+    """
+    attr_class = NamedFieldFile
+
+    @property
+    def name_attname(self):
+        return f'{self.name}_name'
+
+    def pre_save(self, model_instance, add):
+        if not getattr(model_instance, self.attname):
+            setattr(model_instance, self.name_attname, '')
+        return super().pre_save(model_instance, add)
+
+
 class Routine(models.Model):
     semester = models.CharField(
         max_length=10,
         choices=Semester.choices,
         default=Semester.FIRST_SEMESTER
     )
-    file = models.FileField(
+    file = NamedFileField(
         upload_to='routines/',
+        storage=get_blob_storage,
         null=True,
         validators=[validate_file_type]
     )
+    file_name = models.CharField(max_length=255, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     added_by = models.ForeignKey(
         to=User,
@@ -43,15 +79,21 @@ class Routine(models.Model):
 
     class Meta:
         db_table = 'routines'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='routines_created_id_idx'),
+            models.Index(fields=['semester', 'created_at'], name='routines_sem_created_idx'),
+        ]
 
 
 class Notice(models.Model):
     title = models.CharField(max_length=255)
-    file = models.FileField(
+    file = NamedFileField(
         upload_to='notices/',
+        storage=get_blob_storage,
         null=True,
         validators=[validate_file_type]
     )
+    file_name = models.CharField(max_length=255, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     added_by = models.ForeignKey(
         to=User,
@@ -62,6 +104,9 @@ class Notice(models.Model):
 
     class Meta:
         db_table = 'notices'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='notices_created_id_idx'),
+        ]
 
 
 class Class(models.Model):
@@ -71,11 +116,13 @@ class Class(models.Model):
         choices=Semester.choices,
         default=Semester.FIRST_SEMESTER
     )
-    file = models.FileField(
+    file = NamedFileField(
         upload_to='classes/',
+        storage=get_blob_storage,
         validators=[validate_video_type],
         null=True
     )
+    file_name = models.CharField(max_length=255, blank=True, default='', editable=False)
     link = models.CharField(
         max_length=255,
         null=True
@@ -90,15 +137,21 @@ class Class(models.Model):
 
     class Meta:
         db_table = 'classes'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='classes_created_id_idx'),
+            models.Index(fields=['semester', 'created_at'], name='classes_sem_created_idx'),
+        ]
 
 
 class Assignment(models.Model):
     title = models.CharField(max_length=255)
-    file = models.FileField(
+    file = NamedFileField(
         upload_to='assignments/',
+        storage=get_blob_storage,
         validators=[validate_file_type],
         null=True
     )
+    file_name = models.CharField(max_length=255, blank=True, default='', editable=False)
     content = models.TextField(null=True)
     semester = models.CharField(
         max_length=10,
@@ -115,3 +168,166 @@ class Assignment(models.Model):
 
     class Meta:
         db_table = 'assignments'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='assignments_created_id_idx'),
+            models.Index(fields=['semester', 'created_at'], name='assignments_sem_created_idx'),
+        ]
+
+
+class Submission(models.Model):
+    """A student's work on an assignment, a file and/or text, and the teacher's grade."""
+    assignment = models.ForeignKey(
+        to=Assignment,
+        on_delete=models.CASCADE,
+        related_name='submissions'
+    )
+    student = models.ForeignKey(
+        to=User,
+        on_delete=models.CASCADE,
+        related_name='submissions'
+    )
+    file = NamedFileField(
+        upload_to='submissions/',
+        storage=get_blob_storage,
+        validators=[validate_file_type],
+        null=True
+    )
+    file_name = models.CharField(max_length=255, blank=True, default='', editable=False)
+    text = models.TextField(null=True)
+    submitted_at = models.DateTimeField(default=timezone.now)
+    grade = models.PositiveSmallIntegerField(null=True)
+    feedback = models.TextField(null=True)
+    graded_at = models.DateTimeField(null=True)
+    graded_by = models.ForeignKey(
+        to=User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='graded_submissions'
+    )
+
+    class Meta:
+        db_table = 'submissions'
+        constraints = [
+            models.UniqueConstraint(fields=['assignment', 'student'], name='submissions_assignment_student_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['assignment', 'submitted_at', 'id'], name='submissions_assign_sub_idx'),
+        ]
+
+
+class ChunkedUpload(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    checksum = models.CharField(max_length=64)
+    offset = models.BigIntegerField(default=0)
+    # Set while a chunk is written at ``offset``, see classroom.uploads.reserve_chunk.
+    reserved_until = models.DateTimeField(null=True)
+    created_by = models.ForeignKey(
+        to=User,
+        on_delete=models.CASCADE,
+        related_name='chunked_uploads'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True)
+    lecture = models.OneToOneField(
+        to=Class,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='upload'
+    )
+
+    class Meta:
+        db_table = 'chunked_uploads'
+
+
+class Blob(models.Model):
+    """
+    A file of the content addressed storage and the number of Routine/Notice/Class/Assignment/Submission rows using
+    it. ``pending`` counts the saves of the file whose row isn't counted yet, the file is kept while there are any.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    references = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'blobs'
+
+
+class MediaJob(models.Model):
+    """Processing of an uploaded file into its renditions, run by the ``process_media`` worker."""
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        DONE = 'done', 'Done'
+        SKIPPED = 'skipped', 'Skipped'
+        FAILED = 'failed', 'Failed'
+
+    # model_name and pk of the Routine, Notice, Class or Assignment
+    source_type = models.CharField(max_length=20)
+    source_id = models.BigIntegerField()
+    # Name of the processed file, the job is skipped when the source's file was replaced in the meantime
+    file = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = 'media_jobs'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='media_jobs_status_next_idx'),
+        ]
+
+
+class Rendition(models.Model):
+    """
+    A thumbnail, compressed image or lower bitrate video made from the file of a Routine, Notice, Class or
+    Assignment.
+    """
+    class Kind(models.TextChoices):
+        IMAGE = 'image', 'Image'
+        VIDEO = 'video', 'Video'
+
+    source_type = models.CharField(max_length=20)
+    source_id = models.BigIntegerField()
+    # thumbnail, image or the height of a video (360p)
+    name = models.CharField(max_length=20)
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    file = models.FileField(upload_to='renditions/', max_length=255)
+    mime_type = models.CharField(max_length=100)
+    width = models.PositiveIntegerField(null=True)
+    height = models.PositiveIntegerField(null=True)
+    size = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'renditions'
+        constraints = [
+            models.UniqueConstraint(fields=['source_type', 'source_id', 'name'], name='renditions_source_name_uniq'),
+        ]
+
+
+class FeedSection(models.Model):
+    """Serialized snapshot of one section of the per-semester feed, an empty semester is shared by all."""
+    name = models.CharField(max_length=20)
+    semester = models.CharField(
+        max_length=10,
+        choices=Semester.choices,
+        blank=True,
+        default=''
+    )
+    data = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'feed_sections'
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'semester'], name='feed_sections_name_semester_uniq'),
+        ]
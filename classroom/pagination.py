@@ -0,0 +1,22 @@
+from asgiref.sync import sync_to_async
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async counterpart of ``paginate_queryset``. DRF's own runs in the thread the async ORM queries from, the
+        page is still a single query.
+        """
+        return await sync_to_async(self.paginate_queryset)(queryset, request, view)
+
+
+class SubmittedAtCursorPagination(CreatedAtCursorPagination):
+    """Submissions in the order they came in, on the ``(assignment, submitted_at, id)`` index."""
+    ordering = ('submitted_at', 'id')
+    max_page_size = 500
@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from classroom.models import Routine, Notice, Class, Assignment, MediaJob, Rendition
+from dgc.db_router import use_primary
+
+logger = logging.getLogger('classroom.processing')
+
+SOURCE_MODELS = {model._meta.model_name: model for model in (Routine, Notice, Class, Assignment)}
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.mkv', '.webm')
+
+
+class Unprocessable(Exception):
+    """The file has no renditions here, its type is unknown or its tool is not installed. The job is skipped."""
+
+
+def get_source_type(instance):
+    return instance._meta.model_name
+
+
+def queue_processing(instance):
+    """Queue the processing of ``instance.file`` into its renditions, nothing is queued without a file."""
+    if not settings.MEDIA_PROCESSING['ENABLED'] or not instance.file:
+        return None
+    return MediaJob.objects.create(source_type=get_source_type(instance), source_id=instance.pk,
+                                   file=instance.file.name)
+
+
+def delete_renditions(source_type, source_id):
+    """Delete the renditions of a source and their files, e.g. after the source was deleted or its file replaced."""
+    renditions = list(Rendition.objects.filter(source_type=source_type, source_id=source_id).only('id', 'file'))
+    for rendition in renditions:
+        rendition.file.delete(save=False)
+    if renditions:
+        Rendition.objects.filter(pk__in=[rendition.pk for rendition in renditions]).delete()
+
+
+def run_tool(binary, *args):
+    """Run an external program and return its stdout, raises ``Unprocessable`` when it is not installed."""
+    executable = shutil.which(binary)
+    if executable is None:
+        raise Unprocessable(f'{binary} is not installed.')
+    try:
+        result = subprocess.run([executable, *args], capture_output=True, check=True,
+                                timeout=settings.MEDIA_PROCESSING['JOB_TIMEOUT'])
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f'{binary} failed: {e.stderr.decode(errors="replace")[-1000:]}')
+    return result.stdout
+
+
+def open_image(path):
+    """Open an image with Pillow, turned upright and flattened on white for JPEG."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise Unprocessable('Pillow is not installed.')
+
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+
+
+def save_jpeg(image, max_size, path, quality):
+    resized = image.copy()
+    resized.thumbnail((max_size, max_size))
+    resized.save(path, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return {'path': path, 'mime_type': 'image/jpeg', 'width': resized.width, 'height': resized.height}
+
+
+def make_image_renditions(path, directory, config):
+    image = open_image(path)
+    thumbnail = save_jpeg(image, config['THUMBNAIL_SIZE'], os.path.join(directory, 'thumbnail.jpg'),
+                          config['IMAGE_QUALITY'])
+    outputs = [{'name': 'thumbnail', 'kind': Rendition.Kind.IMAGE, **thumbnail}]
+
+    compressed = save_jpeg(image, config['IMAGE_MAX_SIZE'], os.path.join(directory, 'image.jpg'),
+                           config['IMAGE_QUALITY'])
+    # Scans are usually much smaller as JPEG, an upload that already is small is served as it is.
+    if os.path.getsize(compressed['path']) < os.path.getsize(path):
+        outputs.append({'name': 'image', 'kind': Rendition.Kind.IMAGE, **compressed})
+    return outputs
+
+
+def get_image_size(path):
+    try:
+        from PIL import Image
+    except ImportError:
+        return None, None
+    with Image.open(path) as image:
+        return image.size
+
+
+def make_pdf_renditions(path, directory, config):
+    output = os.path.join(directory, 'thumbnail')
+    size = str(config['THUMBNAIL_SIZE'])
+    run_tool(config['PDFTOPPM'], '-f', '1', '-l', '1', '-singlefile', '-jpeg', '-scale-to', size, path, output)
+    width, height = get_image_size(output + '.jpg')
+    return [{
+        'name': 'thumbnail',
+        'kind': Rendition.Kind.IMAGE,
+        'path': output + '.jpg',
+        'mime_type': 'image/jpeg',
+        'width': width,
+        'height': height,
+    }]
+
+
+def probe(path, config):
+    """Return the width, height and duration of a video (or image) with ffprobe, None for what is unknown."""
+    output = run_tool(config['FFPROBE'], '-v', 'error', '-select_streams', 'v:0', '-show_entries',
+                      'stream=width,height:format=duration', '-of', 'json', path)
+    data = json.loads(output)
+    stream = data['streams'][0] if data.get('streams') else {}
+    duration = data.get('format', {}).get('duration')
+    return stream.get('width'), stream.get('height'), float(duration) if duration else None
+
+
+def make_video_renditions(path, directory, config):
+    width, height, duration = probe(path, config)
+
+    thumbnail = os.path.join(directory, 'thumbnail.jpg')
+    size = config['THUMBNAIL_SIZE']
+    run_tool(config['FFMPEG'], '-v', 'error', '-ss', str(min(1.0, (duration or 0) / 2)), '-i', path,
+             '-frames:v', '1', '-vf', f'scale={size}:{size}:force_original_aspect_ratio=decrease', '-y', thumbnail)
+    outputs = [{'name': 'thumbnail', 'kind': Rendition.Kind.IMAGE, 'path': thumbnail, 'mime_type': 'image/jpeg'}]
+
+    for target, bitrate in sorted(config['VIDEO_RENDITIONS']):
+        if not height or target >= height:
+            continue
+        output = os.path.join(directory, f'{target}p.mp4')
+        run_tool(config['FFMPEG'], '-v', 'error', '-i', path, '-map', '0:v:0', '-map', '0:a:0?',
+                 '-vf', f'scale=-2:{target}', '-c:v', 'libx264', '-preset', 'veryfast',
+                 '-b:v', bitrate, '-maxrate', bitrate, '-bufsize', bitrate,
+                 '-c:a', 'aac', '-b:a', config['AUDIO_BITRATE'], '-movflags', '+faststart', '-y', output)
+        outputs.append({'name': f'{target}p', 'kind': Rendition.Kind.VIDEO, 'path': output, 'mime_type': 'video/mp4'})
+
+    for output in outputs:
+        output['width'], output['height'], _ = probe(output['path'], config)
+    return outputs
+
+
+def make_renditions(path, directory, config):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in IMAGE_EXTENSIONS:
+        return make_image_renditions(path, directory, config)
+    if extension == '.pdf':
+        return make_pdf_renditions(path, directory, config)
+    if extension in VIDEO_EXTENSIONS:
+        return make_video_renditions(path, directory, config)
+    raise Unprocessable(f'No renditions are made for {extension or "files without extension"}.')
+
+
+def get_local_path(field_file, directory):
+    """Path of the stored file on this machine, copied into ``directory`` when the storage is not local."""
+    try:
+        return field_file.path
+    except NotImplementedError:
+        path = os.path.join(directory, 'source' + os.path.splitext(field_file.name)[1].lower())
+        with field_file.open('rb') as source, open(path, 'wb') as target:
+            for chunk in source.chunks():
+                target.write(chunk)
+        return path
+
+
+def save_renditions(source, outputs):
+    source_type = get_source_type(source)
+    delete_renditions(source_type, source.pk)
+    for output in outputs:
+        rendition = Rendition(
+            source_type=source_type,
+            source_id=source.pk,
+            name=output['name'],
+            kind=output['kind'],
+            mime_type=output['mime_type'],
+            width=output.get('width'),
+            height=output.get('height'),
+            size=os.path.getsize(output['path']),
+        )
+        with open(output['path'], 'rb') as file:
+            extension = os.path.splitext(output['path'])[1]
+            rendition.file.save(f'{source_type}-{source.pk}-{output["name"]}{extension}', File(file), save=False)
+        rendition.save()
+
+
+def claim_job():
+    """Take the next due job for ``JOB_TIMEOUT`` seconds, after which it is due again if the worker died."""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            MediaJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=MediaJob.Status.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.attempts += 1
+        job.next_attempt_at = now + timezone.timedelta(seconds=settings.MEDIA_PROCESSING['JOB_TIMEOUT'])
+        job.save(update_fields=['attempts', 'next_attempt_at'])
+    return job
+
+
+def finish_job(job, status, error=None):
+    job.status = status
+    job.last_error = error
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'last_error', 'finished_at'])
+    return job
+
+
+def process_job(job):
+    """
+    Make the renditions of the job's file and replace the source's previous ones. Failures are retried with
+    exponential backoff until ``MAX_ATTEMPTS`` is reached.
+    """
+    # Jobs are queued right after their upload, a replica may not have the new or replaced file yet.
+    with use_primary():
+        return _process_job(job)
+
+
+def _process_job(job):
+    config = settings.MEDIA_PROCESSING
+    model = SOURCE_MODELS.get(job.source_type)
+    source = model.objects.filter(pk=job.source_id).only('id', 'file').first() if model else None
+    if source is None or source.file.name != job.file:
+        return finish_job(job, MediaJob.Status.SKIPPED, 'The file was deleted or replaced.')
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            outputs = make_renditions(get_local_path(source.file, directory), directory, config)
+            save_renditions(source, outputs)
+    except Unprocessable as e:
+        return finish_job(job, MediaJob.Status.SKIPPED, str(e))
+    except Exception as e:
+        logger.exception('Processing %s %s failed.', job.source_type, job.source_id)
+        if job.attempts >= config['MAX_ATTEMPTS']:
+            return finish_job(job, MediaJob.Status.FAILED, str(e))
+        job.last_error = str(e)
+        job.next_attempt_at = timezone.now() + timezone.timedelta(
+            seconds=config['RETRY_BACKOFF'] * 2 ** (job.attempts - 1))
+        job.save(update_fields=['last_error', 'next_attempt_at'])
+        return job
+    return finish_job(job, MediaJob.Status.DONE)
+
+
+def process_queued_media(batch_size=10):
+    """Process up to ``batch_size`` due jobs one after the other and return how many were processed."""
+    processed = 0
+    while processed < batch_size:
+        job = claim_job()
+        if job is None:
+            break
+        process_job(job)
+        processed += 1
+    return processed
@@ -1,8 +1,70 @@
+from django.conf import settings
+from django.urls import reverse
 from rest_framework import serializers
-from classroom.models import Routine, Notice, Class, Assignment
 
+from classroom.models import Routine, Notice, Class, Assignment, Submission, ChunkedUpload, validate_video_extension
+from classroom.processing import queue_processing, delete_renditions, get_source_type
+from classroom.storage import get_blob_digest
+
+
+def get_requested_fields(request):
+    """Return the set of field names asked for with ``?fields=a,b``, or None for all fields."""
+    if request is None or request.method != 'GET' or not request.query_params.get('fields'):
+        return None
+    return {field.strip() for field in request.query_params['fields'].split(',') if field.strip()}
+
+
+class FieldsProjectionMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        fields = get_requested_fields(self.context.get('request'))
+        if fields:
+            unknown = fields - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError({'fields': [
+                    f"Unknown fields: {', '.join(sorted(unknown))}. Allowed fields: {', '.join(self.fields)}."
+                ]})
+            for field in set(self.fields) - fields:
+                self.fields.pop(field)
+
+
+class FileURLMixin(serializers.Serializer):
+    """
+    ``file_url``, the endpoint streaming the object's file. Content addressed files are linked with their digest as
+    ``?v=``, which a replaced file changes, so they are cached without revalidation.
+    """
+    file_url = serializers.SerializerMethodField()
+
+    def get_file_url(self, instance):
+        if not instance.file:
+            return None
+        url = reverse(f'{instance._meta.model_name}_file', args=[instance.pk])
+        request = self.context.get('request')
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        digest = get_blob_digest(instance.file.name)
+        return f'{url}?v={digest}' if digest else url
+
+
+class MediaProcessingMixin:
+    """Queues the processing of an uploaded or replaced ``file`` into its renditions, see classroom.processing."""
 
-class RoutineSerializer(serializers.ModelSerializer):
+    def create(self, validated_data):
+        instance = super().create(validated_data)
+        queue_processing(instance)
+        return instance
+
+    def update(self, instance, validated_data):
+        previous_file = instance.file.name
+        instance = super().update(instance, validated_data)
+        if 'file' in validated_data and instance.file.name != previous_file:
+            delete_renditions(get_source_type(instance), instance.pk)
+            queue_processing(instance)
+        return instance
+
+
+class RoutineSerializer(MediaProcessingMixin, FieldsProjectionMixin, FileURLMixin, serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data['added_by'] = self.context['request'].user
         return super().create(validated_data)
@@ -16,7 +78,7 @@ class RoutineSerializer(serializers.ModelSerializer):
         }
 
 
-class NoticeSerializer(serializers.ModelSerializer):
+class NoticeSerializer(MediaProcessingMixin, FieldsProjectionMixin, FileURLMixin, serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data['added_by'] = self.context['request'].user
         return super().create(validated_data)
@@ -29,7 +91,7 @@ class NoticeSerializer(serializers.ModelSerializer):
         }
 
 
-class ClassSerializer(serializers.ModelSerializer):
+class ClassSerializer(MediaProcessingMixin, FieldsProjectionMixin, FileURLMixin, serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data['teacher'] = self.context['request'].user
         return super().create(validated_data)
@@ -42,7 +104,7 @@ class ClassSerializer(serializers.ModelSerializer):
         }
 
 
-class AssignmentSerializer(serializers.ModelSerializer):
+class AssignmentSerializer(MediaProcessingMixin, FieldsProjectionMixin, FileURLMixin, serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data['teacher'] = self.context['request'].user
         return super().create(validated_data)
@@ -54,3 +116,52 @@ class AssignmentSerializer(serializers.ModelSerializer):
             'teacher': {'read_only': True},
             'semester': {'required': True}
         }
+
+
+class SubmissionSerializer(FileURLMixin, serializers.ModelSerializer):
+    student_name = serializers.CharField(source='student.name', read_only=True)
+
+    def validate(self, attrs):
+        if not attrs.get('file') and not attrs.get('text'):
+            raise serializers.ValidationError('Submit a file or a text.')
+        return attrs
+
+    class Meta:
+        model = Submission
+        fields = ('id', 'assignment', 'student', 'student_name', 'file', 'file_url', 'text', 'submitted_at', 'grade',
+                  'feedback', 'graded_at')
+        read_only_fields = ('assignment', 'student', 'submitted_at', 'grade', 'feedback', 'graded_at')
+
+
+class SubmissionGradeSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    grade = serializers.IntegerField(min_value=0, max_value=32767)
+    feedback = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    def validate_filename(self, value):
+        validate_video_extension(value)
+        return value
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('Size must be positive.')
+        if value > settings.CHUNKED_UPLOAD['MAX_SIZE']:
+            raise serializers.ValidationError('File is too large.')
+        return value
+
+    def validate_checksum(self, value):
+        value = value.lower()
+        if len(value) != 64 or any(c not in '0123456789abcdef' for c in value):
+            raise serializers.ValidationError('Checksum must be a hex encoded SHA-256 digest.')
+        return value
+
+    def create(self, validated_data):
+        validated_data['created_by'] = self.context['request'].user
+        return super().create(validated_data)
+
+    class Meta:
+        model = ChunkedUpload
+        fields = ('id', 'filename', 'size', 'checksum', 'offset', 'created_at', 'completed_at', 'lecture')
+        read_only_fields = ('offset', 'completed_at', 'lecture')
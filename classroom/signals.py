@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from classroom.blobs import add_reference, remove_reference
+from classroom.feed import build_section
+from classroom.models import Routine, Notice, Class, Assignment, Submission
+from classroom.processing import delete_renditions, get_source_type
+from dgc.response_cache import invalidate_responses
+
+FEED_SECTION_NAMES = {
+    Routine: 'routine',
+    Class: 'classes',
+    Assignment: 'assignments',
+    Notice: 'notices',
+}
+
+
+@receiver([post_save, post_delete], sender=Routine)
+@receiver([post_save, post_delete], sender=Notice)
+def invalidate_cached_responses(sender, **kwargs):
+    invalidate_responses(sender)
+
+
+@receiver(pre_save, sender=Routine)
+@receiver(pre_save, sender=Notice)
+@receiver(pre_save, sender=Class)
+@receiver(pre_save, sender=Assignment)
+@receiver(pre_save, sender=Submission)
+def remember_previous_values(sender, instance, update_fields=None, **kwargs):
+    if not instance.pk:
+        return
+    fields = [
+        field for field in ('semester', 'file')
+        if hasattr(sender, field) and (update_fields is None or field in update_fields)
+    ]
+    if fields:
+        previous = sender.objects.filter(pk=instance.pk).values(*fields).first() or {}
+        instance._previous_semester = previous.get('semester')
+        instance._previous_file = previous.get('file')
+
+
+@receiver([post_save, post_delete], sender=Routine)
+@receiver([post_save, post_delete], sender=Class)
+@receiver([post_save, post_delete], sender=Assignment)
+@receiver([post_save, post_delete], sender=Notice)
+def rebuild_feed_sections(sender, instance, **kwargs):
+    name = FEED_SECTION_NAMES[sender]
+    semesters = {getattr(instance, 'semester', ''), getattr(instance, '_previous_semester', None)} - {None}
+    for semester in semesters:
+        transaction.on_commit(lambda semester=semester: build_section(name, semester))
+
+
+@receiver(post_delete, sender=Routine)
+@receiver(post_delete, sender=Class)
+@receiver(post_delete, sender=Assignment)
+@receiver(post_delete, sender=Notice)
+def delete_source_renditions(sender, instance, **kwargs):
+    delete_renditions(get_source_type(instance), instance.pk)
+
+
+@receiver(post_save, sender=Routine)
+@receiver(post_save, sender=Notice)
+@receiver(post_save, sender=Class)
+@receiver(post_save, sender=Assignment)
+@receiver(post_save, sender=Submission)
+def count_file_references(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'file' not in update_fields:
+        return
+    previous = None if created else getattr(instance, '_previous_file', None)
+    current = instance.file.name or None
+    if current != previous:
+        if current:
+            add_reference(current)
+        if previous:
+            remove_reference(previous)
+    instance._previous_file = current
+
+
+@receiver(post_delete, sender=Routine)
+@receiver(post_delete, sender=Notice)
+@receiver(post_delete, sender=Class)
+@receiver(post_delete, sender=Assignment)
+@receiver(post_delete, sender=Submission)
+def release_file(sender, instance, **kwargs):
+    if instance.file:
+        remove_reference(instance.file.name)
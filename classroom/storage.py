@@ -0,0 +1,92 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+BLOB_PREFIX = 'blobs/'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every file once under the SHA-256 of its content, ``blobs/ab/abcdef...<extension>``, whatever name it
+    was saved with. Uploading the same file again returns the name of the stored copy. Rows referencing a blob are
+    counted in ``classroom.blobs``, which deletes it with its last reference.
+    """
+    chunk_size = 1024 * 1024
+
+    def get_available_name(self, name, max_length=None):
+        # The stored name only depends on the content, see _save().
+        return name
+
+    def get_blob_name(self, digest, extension):
+        return f'{BLOB_PREFIX}{digest[:2]}/{digest}{extension}'
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+
+        if hasattr(content, 'temporary_file_path'):
+            # Already on disk (large uploads, assembled chunked uploads): hashed in place and moved if new.
+            digest = getattr(content, 'sha256', None) or self.hash_file(content.temporary_file_path())
+            blob_name = self.get_blob_name(digest, extension)
+            self.reserve(blob_name)
+            if not self.exists(blob_name):
+                self.move_into_place(content.temporary_file_path(), blob_name)
+            return blob_name
+
+        # Hashed while it is written to a temporary file next to the blobs, then renamed into place.
+        temp_dir = self.path(BLOB_PREFIX + '.tmp')
+        os.makedirs(temp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                if hasattr(content, 'seek') and content.seekable():
+                    content.seek(0)
+                for chunk in content.chunks(self.chunk_size):
+                    digest.update(chunk)
+                    file.write(chunk)
+
+            blob_name = self.get_blob_name(digest.hexdigest(), extension)
+            self.reserve(blob_name)
+            if not self.exists(blob_name):
+                self.move_into_place(temp_path, blob_name)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return blob_name
+
+    def reserve(self, blob_name):
+        # Before the file is reused, so that the deletion of its last reference can't remove it meanwhile. Imported
+        # here as the models import this module.
+        from classroom.blobs import reserve_blob
+        reserve_blob(blob_name)
+
+    def hash_file(self, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            while data := file.read(self.chunk_size):
+                digest.update(data)
+        return digest.hexdigest()
+
+    def move_into_place(self, path, blob_name):
+        full_path = self.path(blob_name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        file_move_safe(path, full_path, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+
+def get_blob_digest(name):
+    """The SHA-256 a content addressed file is stored under, None for other files."""
+    if not name or not name.startswith(BLOB_PREFIX):
+        return None
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+blob_storage = ContentAddressedStorage()
+
+
+def get_blob_storage():
+    return blob_storage
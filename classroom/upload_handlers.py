@@ -0,0 +1,91 @@
+import os
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework.exceptions import ValidationError
+
+from classroom.file_types import DOCUMENT_EXTENSIONS, DOCUMENT_TYPES, VIDEO_EXTENSIONS, VIDEO_TYPES, HEADER_SIZE, \
+    get_file_type
+from classroom.models import validate_file_type, validate_video_type
+
+# Extensions and types accepted by the file validators of the models.
+VALIDATOR_FILE_TYPES = {
+    validate_file_type: (DOCUMENT_EXTENSIONS, DOCUMENT_TYPES),
+    validate_video_type: (VIDEO_EXTENSIONS, VIDEO_TYPES),
+}
+
+
+def get_accepted_types(model, field_name):
+    """The ``(extensions, types)`` accepted by a file field of ``model``, None when it is not one."""
+    try:
+        field = model._meta.get_field(field_name)
+    except FieldDoesNotExist:
+        return None
+    for validator in field.validators:
+        if validator in VALIDATOR_FILE_TYPES:
+            return VALIDATOR_FILE_TYPES[validator]
+    return None
+
+
+def format_size(size):
+    return f'{size / 1024 ** 2:g} MB'
+
+
+class FileValidationUploadHandler(FileUploadHandler):
+    """
+    Checks the files of a multipart request for ``model`` while it is read, before the handlers that store them: the
+    extension when a file starts, the content type from its first bytes and the ``UPLOAD_MAX_SIZE`` of the model as
+    the chunks come in. A file that fails raises a ``ValidationError`` before anything is stored. Under WSGI the rest
+    of the body is then never read, under ASGI Django has already received it.
+    """
+
+    def __init__(self, request, model):
+        super().__init__(request)
+        self.model = model
+        self.max_size = settings.UPLOAD_MAX_SIZE[model._meta.model_name]
+        self.accepted = None
+        self.header = b''
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Only the file can be large, the other fields are limited to DATA_UPLOAD_MAX_MEMORY_SIZE.
+        fields_size = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        if fields_size is not None and content_length > self.max_size + fields_size:
+            self.reject(f'The file is too large, at most {format_size(self.max_size)} are allowed.')
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.header = b''
+        self.accepted = get_accepted_types(self.model, field_name)
+        if self.accepted is None:
+            return
+        extensions, _ = self.accepted
+        if os.path.splitext(self.file_name)[1].lower() not in extensions:
+            self.reject(f'Only {", ".join(extensions)} files are allowed.')
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.accepted is None:
+            return raw_data
+
+        if start + len(raw_data) > self.max_size:
+            self.reject(f'The file is too large, at most {format_size(self.max_size)} are allowed.')
+        if len(self.header) < HEADER_SIZE:
+            # Usually all in the first chunk.
+            self.header += raw_data[:HEADER_SIZE - len(self.header)]
+            if len(self.header) == HEADER_SIZE:
+                self.check_header()
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.accepted is not None and len(self.header) < HEADER_SIZE:
+            self.check_header()
+        # The file itself is returned by the next handler.
+        return None
+
+    def check_header(self):
+        _, types = self.accepted
+        if get_file_type(self.header) not in types:
+            self.reject(f'The file content is not one of {", ".join(types)}.')
+
+    def reject(self, message):
+        raise ValidationError({self.field_name if self.accepted else 'file': [message]})
@@ -0,0 +1,91 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Q
+from django.utils import timezone
+
+from classroom.models import ChunkedUpload
+
+
+class PartialFile(File):
+    """Lets ``FileSystemStorage`` move the assembled upload into place instead of copying it."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def get_partial_path(upload):
+    directory = settings.CHUNKED_UPLOAD['DIR'] or os.path.join(settings.MEDIA_ROOT, '.partial')
+    return os.path.join(directory, str(upload.id))
+
+
+def reserve_chunk(upload, offset):
+    """
+    Take the right to append at ``offset`` for ``CHUNKED_UPLOAD['LEASE']`` seconds. Returns ``False`` when ``offset``
+    is not the upload's current offset or another chunk is being written.
+    """
+    now = timezone.now()
+    return ChunkedUpload.objects.filter(
+        Q(reserved_until__isnull=True) | Q(reserved_until__lt=now),
+        pk=upload.pk,
+        offset=offset,
+        completed_at__isnull=True,
+    ).update(reserved_until=now + timezone.timedelta(seconds=settings.CHUNKED_UPLOAD['LEASE'])) == 1
+
+
+def write_chunk(upload, stream, length, chunk_size=64 * 1024):
+    """
+    Append ``length`` bytes read from ``stream`` at ``upload.offset``, reserved with ``reserve_chunk``, and advance the
+    offset if it is still the one the chunk was written at. Returns ``False`` when it is not.
+
+    Bytes received before a dropped connection are kept, so the client can resume from the saved offset.
+    """
+    path = get_partial_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, 'ab') as file:
+        # Drop anything past the recorded offset, e.g. a chunk whose offset was never saved.
+        file.truncate(upload.offset)
+        written = 0
+        try:
+            while written < length:
+                data = stream.read(min(chunk_size, length - written))
+                if not data:
+                    break
+                file.write(data)
+                written += len(data)
+        finally:
+            saved = ChunkedUpload.objects.filter(pk=upload.pk, offset=upload.offset).update(
+                offset=upload.offset + written, reserved_until=None,
+            )
+            if saved:
+                upload.offset += written
+    return bool(saved)
+
+
+def get_checksum(upload, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(get_partial_path(upload), 'rb') as file:
+        while data := file.read(chunk_size):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def open_partial_file(upload):
+    return PartialFile(open(get_partial_path(upload), 'rb'), name=upload.filename)
+
+
+def restart_upload(upload):
+    """Reset the upload to offset 0 and delete its partial file, unless another chunk advanced it meanwhile."""
+    if ChunkedUpload.objects.filter(pk=upload.pk, offset=upload.offset).update(offset=0):
+        delete_partial_file(upload)
+    upload.offset = 0
+
+
+def delete_partial_file(upload):
+    try:
+        os.remove(get_partial_path(upload))
+    except FileNotFoundError:
+        pass
@@ -1,17 +1,38 @@
 from django.urls import path
 
-from classroom.views import RoutineListCreateAPIView, RoutineRetrieveUpdateDestroyAPIView, \
-    NoticeListCreateAPIView, NoticeRetrieveUpdateDestroyAPIView, \
-    ClassListCreateAPIView, ClassRetrieveUpdateDestroyAPIView, \
-    AssignmentListCreateAPIView, AssignmentRetrieveUpdateDestroyAPIView
+from classroom.views import RoutineListAsyncAPIView, RoutineRetrieveAsyncAPIView, \
+    NoticeListAsyncAPIView, NoticeRetrieveAsyncAPIView, \
+    ClassListAsyncAPIView, ClassRetrieveAsyncAPIView, \
+    AssignmentListAsyncAPIView, AssignmentRetrieveAsyncAPIView, \
+    RoutineFileAPIView, NoticeFileAPIView, ClassFileAPIView, AssignmentFileAPIView, \
+    RoutineRenditionListAPIView, NoticeRenditionListAPIView, ClassRenditionListAPIView, \
+    AssignmentRenditionListAPIView, SubmissionListCreateAPIView, SubmissionGradeAPIView, SubmissionFileAPIView, \
+    AssignmentExportAPIView, ChunkedUploadCreateAPIView, ChunkedUploadAPIView, ChunkedUploadFinalizeAPIView, FeedAPIView
 
+# GET is served by the async views, other methods by their DRF view_class.
 urlpatterns = [
-    path('routines/', RoutineListCreateAPIView.as_view(), name='routines'),
-    path('routines/<int:pk>/', RoutineRetrieveUpdateDestroyAPIView.as_view(), name='routine'),
-    path('notices/', NoticeListCreateAPIView.as_view(), name='notices'),
-    path('notices/<int:pk>/', NoticeRetrieveUpdateDestroyAPIView.as_view(), name='notice'),
-    path('classes/', ClassListCreateAPIView.as_view(), name='classes'),
-    path('classes/<int:pk>/', ClassRetrieveUpdateDestroyAPIView.as_view(), name='class'),
-    path('assignments/', AssignmentListCreateAPIView.as_view(), name='assignments'),
-    path('assignments/<int:pk>/', AssignmentRetrieveUpdateDestroyAPIView.as_view(), name='assignment'),
+    path('routines/', RoutineListAsyncAPIView.as_view(), name='routines'),
+    path('routines/<int:pk>/', RoutineRetrieveAsyncAPIView.as_view(), name='routine'),
+    path('routines/<int:pk>/file/', RoutineFileAPIView.as_view(), name='routine_file'),
+    path('routines/<int:pk>/renditions/', RoutineRenditionListAPIView.as_view(), name='routine_renditions'),
+    path('notices/', NoticeListAsyncAPIView.as_view(), name='notices'),
+    path('notices/<int:pk>/', NoticeRetrieveAsyncAPIView.as_view(), name='notice'),
+    path('notices/<int:pk>/file/', NoticeFileAPIView.as_view(), name='notice_file'),
+    path('notices/<int:pk>/renditions/', NoticeRenditionListAPIView.as_view(), name='notice_renditions'),
+    path('classes/', ClassListAsyncAPIView.as_view(), name='classes'),
+    path('classes/<int:pk>/', ClassRetrieveAsyncAPIView.as_view(), name='class'),
+    path('classes/<int:pk>/file/', ClassFileAPIView.as_view(), name='class_file'),
+    path('classes/<int:pk>/renditions/', ClassRenditionListAPIView.as_view(), name='class_renditions'),
+    path('classes/uploads/', ChunkedUploadCreateAPIView.as_view(), name='class_uploads'),
+    path('classes/uploads/<uuid:pk>/', ChunkedUploadAPIView.as_view(), name='class_upload'),
+    path('classes/uploads/<uuid:pk>/finalize/', ChunkedUploadFinalizeAPIView.as_view(), name='class_upload_finalize'),
+    path('assignments/', AssignmentListAsyncAPIView.as_view(), name='assignments'),
+    path('assignments/<int:pk>/', AssignmentRetrieveAsyncAPIView.as_view(), name='assignment'),
+    path('assignments/<int:pk>/file/', AssignmentFileAPIView.as_view(), name='assignment_file'),
+    path('assignments/<int:pk>/renditions/', AssignmentRenditionListAPIView.as_view(), name='assignment_renditions'),
+    path('assignments/<int:pk>/submissions/', SubmissionListCreateAPIView.as_view(), name='assignment_submissions'),
+    path('assignments/<int:pk>/submissions/grades/', SubmissionGradeAPIView.as_view(), name='submission_grades'),
+    path('assignments/<int:pk>/export/', AssignmentExportAPIView.as_view(), name='assignment_export'),
+    path('submissions/<int:pk>/file/', SubmissionFileAPIView.as_view(), name='submission_file'),
+    path('feed/', FeedAPIView.as_view(), name='feed'),
 ]
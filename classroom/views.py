@@ -1,14 +1,72 @@
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.core.files.uploadhandler import MemoryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView, CreateAPIView, \
+    get_object_or_404
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from account.permissions import IsAdmin, IsAdminOrTeacher
-from classroom.models import Routine, Notice, Class, Assignment
-from classroom.serializers import RoutineSerializer, NoticeSerializer, ClassSerializer, AssignmentSerializer
+from account.permissions import IsAdmin, IsAdminOrTeacher, IsStudent
+from dgc.async_views import AsyncListAPIView, AsyncRetrieveAPIView
+from dgc.response_cache import CachedResponseMixin
+from account.enums import Semester
+from account.models import User
+from classroom.archives import get_assignment_entries, stream_zip, astream_zip
+from classroom.feed import get_feed
+from classroom.file_types import HEADER_SIZE
+from classroom.filters import FieldFilter, FullTextSearchFilter, StableOrderingFilter
+from classroom.media import serve_file
+from classroom.models import Routine, Notice, Class, Assignment, Submission, ChunkedUpload, Rendition, \
+    validate_video_type
+from classroom.processing import get_source_type
+from classroom.pagination import CreatedAtCursorPagination, SubmittedAtCursorPagination
+from classroom.serializers import RoutineSerializer, NoticeSerializer, ClassSerializer, AssignmentSerializer, \
+    SubmissionSerializer, SubmissionGradeSerializer, ChunkedUploadSerializer, get_requested_fields
+from classroom.upload_handlers import FileValidationUploadHandler
+from classroom.uploads import reserve_chunk, write_chunk, get_checksum, open_partial_file, delete_partial_file, \
+    restart_upload
 
 
-class RoutineListCreateAPIView(ListCreateAPIView):
+class FieldsProjectionQuerysetMixin:
+    """Only load the columns requested with ``?fields=`` (plus the pagination keys) from the database."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = get_requested_fields(self.request)
+        if fields:
+            model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+            # The ordering field is read from the page's rows for the cursor
+            ordering = self.request.query_params.get('ordering', '')
+            ordering = {field.strip().lstrip('-') for field in ordering.split(',')}
+            if 'file_url' in fields:
+                fields = fields | {'file'}
+            queryset = queryset.only('id', 'created_at', *((fields | ordering) & model_fields))
+        return queryset
+
+
+class FileValidationMixin:
+    """
+    Checks uploaded files while the request body is read, once the request is authenticated and allowed, see
+    :class:`classroom.upload_handlers.FileValidationUploadHandler`.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        request.upload_handlers.insert(0, FileValidationUploadHandler(request, self.queryset.model))
+
+
+class RoutineListCreateAPIView(FileValidationMixin, FieldsProjectionQuerysetMixin, ListCreateAPIView):
     queryset = Routine.objects.all()
     serializer_class = RoutineSerializer
+    pagination_class = CreatedAtCursorPagination
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -16,7 +74,8 @@ class RoutineListCreateAPIView(ListCreateAPIView):
         return []
 
 
-class RoutineRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
+class RoutineRetrieveUpdateDestroyAPIView(FileValidationMixin, FieldsProjectionQuerysetMixin,
+                                          RetrieveUpdateDestroyAPIView):
     queryset = Routine.objects.all()
     serializer_class = RoutineSerializer
 
@@ -26,9 +85,10 @@ class RoutineRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
         return []
 
 
-class NoticeListCreateAPIView(ListCreateAPIView):
+class NoticeListCreateAPIView(FileValidationMixin, FieldsProjectionQuerysetMixin, ListCreateAPIView):
     queryset = Notice.objects.all()
     serializer_class = NoticeSerializer
+    pagination_class = CreatedAtCursorPagination
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -36,7 +96,8 @@ class NoticeListCreateAPIView(ListCreateAPIView):
         return []
 
 
-class NoticeRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
+class NoticeRetrieveUpdateDestroyAPIView(FileValidationMixin, FieldsProjectionQuerysetMixin,
+                                         RetrieveUpdateDestroyAPIView):
     queryset = Notice.objects.all()
     serializer_class = NoticeSerializer
 
@@ -46,9 +107,14 @@ class NoticeRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
         return []
 
 
-class ClassListCreateAPIView(ListCreateAPIView):
+class ClassListCreateAPIView(FileValidationMixin, FieldsProjectionQuerysetMixin, ListCreateAPIView):
     queryset = Class.objects.all()
     serializer_class = ClassSerializer
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = [FieldFilter, FullTextSearchFilter, StableOrderingFilter]
+    filter_fields = ('semester', 'teacher')
+    search_fields = ('title',)
+    ordering_fields = ('created_at', 'title')
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -56,7 +122,8 @@ class ClassListCreateAPIView(ListCreateAPIView):
         return [IsAuthenticated()]
 
 
-class ClassRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
+class ClassRetrieveUpdateDestroyAPIView(FileValidationMixin, FieldsProjectionQuerysetMixin,
+                                        RetrieveUpdateDestroyAPIView):
     queryset = Class.objects.all()
     serializer_class = ClassSerializer
 
@@ -66,9 +133,14 @@ class ClassRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
         return [IsAuthenticated()]
 
 
-class AssignmentListCreateAPIView(ListCreateAPIView):
+class AssignmentListCreateAPIView(FileValidationMixin, FieldsProjectionQuerysetMixin, ListCreateAPIView):
     queryset = Assignment.objects.all()
     serializer_class = AssignmentSerializer
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = [FieldFilter, FullTextSearchFilter, StableOrderingFilter]
+    filter_fields = ('semester', 'teacher')
+    search_fields = ('title', 'content')
+    ordering_fields = ('created_at', 'title')
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -76,7 +148,8 @@ class AssignmentListCreateAPIView(ListCreateAPIView):
         return [IsAuthenticated()]
 
 
-class AssignmentRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
+class AssignmentRetrieveUpdateDestroyAPIView(FileValidationMixin, FieldsProjectionQuerysetMixin,
+                                             RetrieveUpdateDestroyAPIView):
     queryset = Assignment.objects.all()
     serializer_class = AssignmentSerializer
 
@@ -84,3 +157,411 @@ class AssignmentRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
         if self.request.method != 'GET':
             return [IsAuthenticated(), IsAdminOrTeacher()]
         return [IsAuthenticated()]
+
+
+class RoutineListAsyncAPIView(CachedResponseMixin, AsyncListAPIView):
+    view_class = RoutineListCreateAPIView
+    cache_model = Routine
+
+
+class RoutineRetrieveAsyncAPIView(CachedResponseMixin, AsyncRetrieveAPIView):
+    view_class = RoutineRetrieveUpdateDestroyAPIView
+    cache_model = Routine
+
+
+class NoticeListAsyncAPIView(CachedResponseMixin, AsyncListAPIView):
+    view_class = NoticeListCreateAPIView
+    cache_model = Notice
+
+
+class NoticeRetrieveAsyncAPIView(CachedResponseMixin, AsyncRetrieveAPIView):
+    view_class = NoticeRetrieveUpdateDestroyAPIView
+    cache_model = Notice
+
+
+class ClassListAsyncAPIView(AsyncListAPIView):
+    view_class = ClassListCreateAPIView
+
+
+class ClassRetrieveAsyncAPIView(AsyncRetrieveAPIView):
+    view_class = ClassRetrieveUpdateDestroyAPIView
+
+
+class AssignmentListAsyncAPIView(AsyncListAPIView):
+    view_class = AssignmentListCreateAPIView
+
+
+class AssignmentRetrieveAsyncAPIView(AsyncRetrieveAPIView):
+    view_class = AssignmentRetrieveUpdateDestroyAPIView
+
+
+class SourceObjectAPIView(APIView):
+    """Base of the views of an object's file, with the GET permissions of the object's ``view_class``."""
+    view_class = None
+
+    def get_permissions(self):
+        view = self.view_class()
+        view.request = self.request
+        return view.get_permissions()
+
+    def get_object(self, pk):
+        instance = get_object_or_404(self.view_class.queryset.only('id', 'file', 'file_name'), pk=pk)
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+
+class FileAPIView(SourceObjectAPIView):
+    """
+    Streams the ``file`` of the object served by ``view_class``, or with ``?rendition=<name>`` one of its
+    renditions (see :class:`RenditionListAPIView`).
+    """
+
+    def perform_content_negotiation(self, request, force=False):
+        # Media players send Accept headers like video/*, errors are still rendered as JSON.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, pk):
+        instance = self.get_object(pk)
+        if request.query_params.get('rendition'):
+            rendition = Rendition.objects.filter(
+                source_type=get_source_type(instance), source_id=instance.pk, name=request.query_params['rendition']
+            ).only('file').first()
+            if rendition is None:
+                raise Http404('No such rendition.')
+            return serve_file(request, rendition.file)
+
+        if not instance.file:
+            raise Http404('No file is attached.')
+        return serve_file(request, instance.file, instance.file_name)
+
+
+class RenditionListAPIView(SourceObjectAPIView):
+    """The renditions made from the object's file so far, with the URL each is served at."""
+    file_url_name = None
+
+    def get(self, request, pk):
+        instance = self.get_object(pk)
+        renditions = Rendition.objects.filter(source_type=get_source_type(instance), source_id=instance.pk)
+        file_url = request.build_absolute_uri(reverse(self.file_url_name, args=[instance.pk]))
+        return Response([
+            {**rendition, 'url': f'{file_url}?rendition={rendition["name"]}'}
+            for rendition in renditions.order_by('id').values('name', 'kind', 'mime_type', 'width', 'height', 'size')
+        ])
+
+
+class RoutineFileAPIView(FileAPIView):
+    view_class = RoutineRetrieveUpdateDestroyAPIView
+
+
+class NoticeFileAPIView(FileAPIView):
+    view_class = NoticeRetrieveUpdateDestroyAPIView
+
+
+class ClassFileAPIView(FileAPIView):
+    view_class = ClassRetrieveUpdateDestroyAPIView
+
+
+class AssignmentFileAPIView(FileAPIView):
+    view_class = AssignmentRetrieveUpdateDestroyAPIView
+
+
+class RoutineRenditionListAPIView(RenditionListAPIView):
+    view_class = RoutineRetrieveUpdateDestroyAPIView
+    file_url_name = 'routine_file'
+
+
+class NoticeRenditionListAPIView(RenditionListAPIView):
+    view_class = NoticeRetrieveUpdateDestroyAPIView
+    file_url_name = 'notice_file'
+
+
+class ClassRenditionListAPIView(RenditionListAPIView):
+    view_class = ClassRetrieveUpdateDestroyAPIView
+    file_url_name = 'class_file'
+
+
+class AssignmentRenditionListAPIView(RenditionListAPIView):
+    view_class = AssignmentRetrieveUpdateDestroyAPIView
+    file_url_name = 'assignment_file'
+
+
+def can_grade(user, assignment):
+    return user.user_type == User.UserType.ADMIN or user.id == assignment.teacher_id
+
+
+class SubmissionListCreateAPIView(FileValidationMixin, ListCreateAPIView):
+    """
+    The submissions of an assignment: all of them, oldest first, for its teacher and the admins, the student's own
+    for students. Students submit a ``file`` and/or ``text`` once per assignment.
+    """
+    queryset = Submission.objects.all()
+    serializer_class = SubmissionSerializer
+    pagination_class = SubmittedAtCursorPagination
+
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [IsAuthenticated(), IsStudent()]
+        return [IsAuthenticated()]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Uploads go to a temporary file the storage moves into place, instead of being kept in memory and copied,
+        # which adds up when a whole class submits before the deadline.
+        request.upload_handlers[:] = [
+            handler for handler in request.upload_handlers if not isinstance(handler, MemoryFileUploadHandler)
+        ]
+
+    def get_assignment(self):
+        return get_object_or_404(Assignment.objects.only('id', 'teacher_id'), pk=self.kwargs['pk'])
+
+    def get_queryset(self):
+        queryset = super().get_queryset().filter(assignment_id=self.kwargs['pk']).select_related('student')
+        if self.request.user.user_type == User.UserType.STUDENT:
+            return queryset.filter(student=self.request.user)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        assignment = self.get_assignment()
+        if request.user.user_type != User.UserType.STUDENT and not can_grade(request.user, assignment):
+            self.permission_denied(request)
+        return super().list(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        assignment = self.get_assignment()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                serializer.save(assignment=assignment, student=request.user)
+        except IntegrityError:
+            # The unique (assignment, student) constraint, a stored file without a row is removed by collect_blobs.
+            return Response(
+                data={"error": "You already submitted this assignment."},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class SubmissionGradeAPIView(APIView):
+    """Grade many submissions of an assignment at once with ``[{"id", "grade", "feedback"}, ...]``."""
+    permission_classes = [IsAuthenticated, IsAdminOrTeacher]
+    max_grades = 1000
+
+    def post(self, request, pk):
+        assignment = get_object_or_404(Assignment.objects.only('id', 'teacher_id'), pk=pk)
+        if not can_grade(request.user, assignment):
+            self.permission_denied(request)
+
+        serializer = SubmissionGradeSerializer(data=request.data, many=True, max_length=self.max_grades)
+        serializer.is_valid(raise_exception=True)
+        grades = {item['id']: item for item in serializer.validated_data}
+        if len(grades) != len(serializer.validated_data):
+            return Response(
+                data={"error": "Every submission can only be graded once per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        found = set(Submission.objects.filter(assignment=assignment, pk__in=grades).values_list('id', flat=True))
+        if len(found) != len(grades):
+            return Response(
+                data={"error": "Submissions not found for this assignment.", "ids": sorted(set(grades) - found)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        now = timezone.now()
+        submissions = [
+            Submission(pk=pk, grade=item['grade'], feedback=item.get('feedback'), graded_at=now, graded_by=request.user)
+            for pk, item in grades.items()
+        ]
+        Submission.objects.bulk_update(submissions, ['grade', 'feedback', 'graded_at', 'graded_by'], batch_size=500)
+        return Response({"graded": len(submissions)})
+
+
+class SubmissionFileAPIView(FileAPIView):
+    """Streams a submission's file to its student, the assignment's teacher and the admins."""
+
+    def get_permissions(self):
+        return [IsAuthenticated()]
+
+    def get_object(self, pk):
+        submission = get_object_or_404(
+            Submission.objects.select_related('assignment')
+            .only('id', 'file', 'file_name', 'student_id', 'assignment__teacher_id'),
+            pk=pk
+        )
+        if self.request.user.id != submission.student_id and not can_grade(self.request.user, submission.assignment):
+            self.permission_denied(self.request)
+        return submission
+
+
+class AssignmentExportAPIView(APIView):
+    """
+    The assignment's text and file and all its submissions as one ZIP, built while it is downloaded (see
+    :func:`classroom.archives.stream_zip`).
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrTeacher]
+
+    def perform_content_negotiation(self, request, force=False):
+        # Downloads accept application/zip, errors are still rendered as JSON.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, pk):
+        assignment = get_object_or_404(
+            Assignment.objects.only('id', 'file', 'file_name', 'content', 'created_at', 'teacher_id'), pk=pk
+        )
+        if not can_grade(request.user, assignment):
+            self.permission_denied(request)
+
+        # Only the list of entries is read before streaming, the generator does not query the database.
+        entries = get_assignment_entries(assignment)
+        chunk_size = settings.MEDIA_SENDFILE.get('CHUNK_SIZE', 512 * 1024)
+        if isinstance(request._request, ASGIRequest):
+            content = astream_zip(entries, chunk_size)
+        else:
+            content = stream_zip(entries, chunk_size)
+        return StreamingHttpResponse(
+            content,
+            content_type='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="assignment-{assignment.id}.zip"'},
+        )
+
+
+class ChunkedUploadCreateAPIView(CreateAPIView):
+    serializer_class = ChunkedUploadSerializer
+    permission_classes = [IsAuthenticated, IsAdminOrTeacher]
+
+
+class ChunkedUploadAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminOrTeacher]
+    serializer_class = ChunkedUploadSerializer
+
+    def get(self, request, pk):
+        upload = get_object_or_404(ChunkedUpload, pk=pk, created_by=request.user)
+        return Response(self.serializer_class(upload).data)
+
+    def put(self, request, pk):
+        """Append the raw request body at the ``Upload-Offset`` header, which must equal the current offset."""
+        upload = get_object_or_404(ChunkedUpload, pk=pk, created_by=request.user)
+        if upload.completed_at:
+            return Response(
+                data={"error": "Upload is already finalized."},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            return Response(
+                data={"error": "Upload-Offset and Content-Length headers are required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if length <= 0 or length > settings.CHUNKED_UPLOAD['MAX_CHUNK_SIZE'] or offset + length > upload.size:
+            return Response(
+                data={"error": "Invalid chunk size.", "offset": upload.offset},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # The chunk is read without a lock held, other requests for the upload are refused meanwhile.
+        if not reserve_chunk(upload, offset):
+            upload.refresh_from_db(fields=['offset'])
+            return Response(
+                data={"error": "Offset does not match the uploaded size.", "offset": upload.offset},
+                status=status.HTTP_409_CONFLICT
+            )
+        upload.offset = offset
+
+        try:
+            saved = write_chunk(upload, request.stream, length)
+        except OSError:
+            return Response(
+                data={"error": "Upload interrupted.", "offset": upload.offset},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not saved:
+            upload.refresh_from_db(fields=['offset'])
+            return Response(
+                data={"error": "Offset does not match the uploaded size.", "offset": upload.offset},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        # Checked as soon as the first bytes arrived, not after the whole file was uploaded.
+        if offset < HEADER_SIZE and (upload.offset >= HEADER_SIZE or upload.offset == upload.size):
+            try:
+                with open_partial_file(upload) as file:
+                    validate_video_type(file)
+            except DjangoValidationError as e:
+                restart_upload(upload)
+                return Response(
+                    data={"error": e.messages[0], "offset": 0},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        return Response(self.serializer_class(upload).data)
+
+
+class ChunkedUploadFinalizeAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminOrTeacher]
+
+    def post(self, request, pk):
+        """Verify the assembled file and create the ``Class`` it belongs to from the posted fields."""
+        with transaction.atomic():
+            upload = get_object_or_404(ChunkedUpload.objects.select_for_update(), pk=pk, created_by=request.user)
+            if upload.completed_at:
+                return Response(
+                    data={"error": "Upload is already finalized."},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if upload.offset != upload.size:
+                return Response(
+                    data={"error": "Upload is incomplete.", "offset": upload.offset},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            serializer = ClassSerializer(data=request.data, context={'request': request})
+            serializer.is_valid(raise_exception=True)
+
+            if get_checksum(upload) != upload.checksum:
+                delete_partial_file(upload)
+                upload.offset = 0
+                upload.save(update_fields=['offset'])
+                return Response(
+                    data={"error": "Checksum does not match, upload the file again.", "offset": 0},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            with open_partial_file(upload) as file:
+                try:
+                    validate_video_type(file)
+                except DjangoValidationError as e:
+                    raise ValidationError({'file': e.messages})
+                # Verified above, the storage does not hash the file again.
+                file.sha256 = upload.checksum
+                lecture = serializer.save(file=file)
+            # Left in place when the same lecture was stored before.
+            delete_partial_file(upload)
+
+            upload.lecture = lecture
+            upload.completed_at = timezone.now()
+            upload.save(update_fields=['lecture', 'completed_at'])
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class FeedAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Routine, recent classes, assignments and notices of the student's semester in one response."""
+        semester = request.GET.get('semester')
+        if request.user.user_type == User.UserType.STUDENT:
+            profile = getattr(request.user, 'student_profile', None)
+            semester = profile.semester if profile else None
+
+        if semester not in Semester.values:
+            return Response(
+                data={"error": "A valid semester is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(get_feed(semester, request))
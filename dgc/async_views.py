@@ -0,0 +1,130 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import exception_handler
+
+from account.authentication import CachedTokenAuthentication
+
+
+class APIJSONResponse(HttpResponse):
+    """
+    Already rendered JSON response that exposes ``data`` like DRF's ``Response``. It can also be built from
+    rendered ``content``, in which case ``data`` is only parsed when accessed.
+    """
+
+    def __init__(self, data=None, status=None, headers=None, content=None):
+        if content is None:
+            content = JSONRenderer().render(data)
+            self._data = data
+        super().__init__(content, content_type='application/json', status=status, headers=headers)
+
+    @property
+    def data(self):
+        if not hasattr(self, '_data'):
+            self._data = json.loads(self.content)
+        return self._data
+
+
+class AsyncAPIView(View):
+    """
+    Serves GET natively under ASGI for the DRF view in ``view_class``.
+
+    The DRF view instance still provides the queryset, serializer, permissions and paginator, while
+    authentication and database access go through the async ORM. That still runs each query in the
+    thread ``sync_to_async`` uses, but the event loop is free while it waits instead of a worker thread
+    being held for the whole request. Every other method is delegated to ``view_class`` itself.
+    Responses are always JSON.
+    """
+    view_class = None
+    authentication_class = CachedTokenAuthentication
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Same as DRF, authentication is token based so CSRF does not apply.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await sync_to_async(self.view_class.as_view())(request, *args, **kwargs)
+
+        api_view = self.view_class()
+        api_view.args = args
+        api_view.kwargs = kwargs
+        api_view.format_kwarg = None
+        api_view.request = api_request = api_view.initialize_request(request, *args, **kwargs)
+        self.api_view = api_view
+
+        try:
+            await self.authenticate(api_request)
+            api_view.check_permissions(api_request)
+            return await self.get(api_request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(exc)
+
+    async def authenticate(self, request):
+        authenticator = self.authentication_class()
+        user_auth = await authenticator.aauthenticate(request)
+
+        # Mirrors Request._authenticate() so DRF permission checks see the outcome.
+        if user_auth is None:
+            request._authenticator = None
+            request.user, request.auth = AnonymousUser(), None
+        else:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth
+
+    def handle_exception(self, exc):
+        request = self.api_view.request
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = self.authentication_class().authenticate_header(request)
+
+        response = exception_handler(exc, {'view': self.api_view, 'request': request})
+        if response is None:
+            raise exc
+
+        headers = {header: value for header, value in response.items() if header != 'Content-Type'}
+        return APIJSONResponse(response.data, status=response.status_code, headers=headers)
+
+    async def get(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+
+class AsyncListAPIView(AsyncAPIView):
+    """Async GET for ``ListAPIView`` style views, paginated with ``apaginate_queryset``."""
+
+    async def get(self, request, *args, **kwargs):
+        view = self.api_view
+        queryset = view.filter_queryset(view.get_queryset())
+
+        if view.paginator is not None:
+            page = await view.paginator.apaginate_queryset(queryset, request, view=view)
+            if page is not None:
+                serializer = view.get_serializer(page, many=True)
+                return APIJSONResponse(view.get_paginated_response(serializer.data).data)
+
+        serializer = view.get_serializer([instance async for instance in queryset], many=True)
+        return APIJSONResponse(serializer.data)
+
+
+class AsyncRetrieveAPIView(AsyncAPIView):
+    """Async GET for ``RetrieveAPIView`` style views."""
+
+    async def get(self, request, *args, **kwargs):
+        view = self.api_view
+        queryset = view.filter_queryset(view.get_queryset())
+
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        try:
+            instance = await queryset.aget(**{view.lookup_field: kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404('No %s matches the given query.' % queryset.model._meta.object_name)
+
+        view.check_object_permissions(request, instance)
+        return APIJSONResponse(view.get_serializer(instance).data)
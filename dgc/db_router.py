@@ -0,0 +1,75 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_use_primary = ContextVar('use_primary', default=False)
+
+
+@contextmanager
+def use_primary():
+    """Send the reads of the enclosed code (and the sync or async code it calls) to the primary."""
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+def get_replicas():
+    return settings.DATABASE_REPLICATION['REPLICAS']
+
+
+def get_sticky_cache():
+    return caches[settings.DATABASE_REPLICATION['CACHE_ALIAS']]
+
+
+def get_sticky_key(credentials):
+    return 'db-primary:' + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def mark_recent_write(credentials):
+    """
+    Read from the primary for the next ``DATABASE_REPLICATION['STICKY_SECONDS']`` on the requests authenticated with
+    ``credentials`` (a token key or session key), while the replicas catch up with their write.
+    """
+    if get_replicas():
+        get_sticky_cache().set(get_sticky_key(credentials), True, settings.DATABASE_REPLICATION['STICKY_SECONDS'])
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of ``DATABASE_REPLICATION['APPS']`` to a random replica and every write to the primary. Reads
+    stay on the primary inside transactions, inside :func:`use_primary` (the requests of a client that just wrote,
+    see :class:`dgc.middleware.PrimaryDatabaseMiddleware`) and for ``PRIMARY_MODELS``, which are read right after
+    they are written.
+    """
+
+    def db_for_read(self, model, **hints):
+        config = settings.DATABASE_REPLICATION
+        if model._meta.app_label not in config['APPS']:
+            return None
+        if (not config['REPLICAS'] or _use_primary.get() or model._meta.label_lower in config['PRIMARY_MODELS']
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(config['REPLICAS'])
+
+    def db_for_write(self, model, **hints):
+        # Explicitly, otherwise Django saves an instance read from a replica back to that replica.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication.
+        if db in get_replicas():
+            return False
+        return None
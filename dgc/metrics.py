@@ -0,0 +1,119 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+from account.permissions import IsAdmin
+
+
+class Histogram:
+    """Cumulative histogram per label set, rendered in the Prometheus text exposition format."""
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total = self._samples.get(key, ([0] * (len(self.buckets) + 1), 0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._samples[key] = (counts, total + value)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            samples = sorted((key, list(counts), total) for key, (counts, total) in self._samples.items())
+
+        for key, counts, total in samples:
+            labels = ','.join(f'{name}="{escape_label(value)}"' for name, value in key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return '\n'.join(lines)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+REQUEST_DURATION = Histogram(
+    'dgc_request_duration_seconds', 'Wall time spent handling the request.',
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_DURATION = Histogram(
+    'dgc_request_db_duration_seconds', 'Time spent in SQL queries while handling the request.',
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_QUERIES = Histogram(
+    'dgc_request_db_queries', 'Number of SQL queries issued while handling the request.',
+    (0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+RESPONSE_SIZE = Histogram(
+    'dgc_response_size_bytes', 'Size of the response body, streaming responses without a length are left out.',
+    (256, 1024, 4096, 16384, 65536, 262144, 1048576, 10485760),
+)
+HISTOGRAMS = (REQUEST_DURATION, DB_DURATION, DB_QUERIES, RESPONSE_SIZE)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# Set by MetricsMiddleware for the duration of a request, also seen by the ORM in sync_to_async threads.
+current_query_stats = ContextVar('current_query_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.duration += time.perf_counter() - start
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def enable_query_recording():
+    connection_created.connect(install_query_recorder, dispatch_uid='dgc.metrics.install_query_recorder')
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+
+
+def render_metrics():
+    return '\n'.join(histogram.render() for histogram in HISTOGRAMS) + '\n'
+
+
+class MetricsAPIView(APIView):
+    """Metrics of this worker process in the Prometheus text format."""
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,136 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.permissions import SAFE_METHODS
+
+from dgc.db_router import _use_primary, get_sticky_cache, get_sticky_key, mark_recent_write
+from dgc.metrics import REQUEST_DURATION, DB_DURATION, DB_QUERIES, RESPONSE_SIZE, QueryStats, \
+    current_query_stats, enable_query_recording
+
+logger = logging.getLogger('dgc.metrics')
+
+
+class MetricsMiddleware:
+    """
+    Records wall time, SQL time, query count and response size per route into ``dgc.metrics`` and logs a
+    warning when a request issues more than ``METRICS['QUERY_BUDGET']`` queries. Disabled unless
+    ``METRICS['ENABLED']`` is set.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.query_budget = settings.METRICS['QUERY_BUDGET']
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        enable_query_recording()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_query_stats.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_query_stats.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, stats, duration):
+        match = request.resolver_match
+        labels = {
+            'route': '/' + match.route if match else 'unmatched',
+            'method': request.method,
+        }
+        REQUEST_DURATION.observe(duration, **labels)
+        DB_DURATION.observe(stats.duration, **labels)
+        DB_QUERIES.observe(stats.count, **labels)
+
+        if response.has_header('Content-Length'):
+            RESPONSE_SIZE.observe(int(response['Content-Length']), **labels)
+        elif not response.streaming:
+            RESPONSE_SIZE.observe(len(response.content), **labels)
+
+        if self.query_budget and stats.count > self.query_budget:
+            logger.warning(
+                'Possible N+1 queries: %s %s issued %d queries (budget %d).',
+                request.method, request.path, stats.count, self.query_budget
+            )
+
+
+def get_credentials(request):
+    """The token key of the ``Authorization`` header, or the session key, identifying the client of ``request``."""
+    authorization = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(authorization) == 2:
+        return authorization[1]
+    return request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+
+
+class PrimaryDatabaseMiddleware:
+    """
+    Runs writes (unsafe methods) on the primary database and keeps the client that sent them on the primary for
+    ``DATABASE_REPLICATION['STICKY_SECONDS']``, so it reads its own writes while the replicas catch up, see
+    ``dgc.db_router.ReplicaRouter``. Disabled without replicas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICATION['REPLICAS']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        credentials = get_credentials(request)
+        write = request.method not in SAFE_METHODS
+        primary = write or bool(credentials and get_sticky_cache().get(get_sticky_key(credentials)))
+        token = _use_primary.set(primary)
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_primary.reset(token)
+        if write and credentials:
+            mark_recent_write(credentials)
+        return response
+
+    async def __acall__(self, request):
+        credentials = get_credentials(request)
+        write = request.method not in SAFE_METHODS
+        primary = write or bool(credentials and await get_sticky_cache().aget(get_sticky_key(credentials)))
+        token = _use_primary.set(primary)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_primary.reset(token)
+        if write and credentials:
+            await get_sticky_cache().aset(
+                get_sticky_key(credentials), True, settings.DATABASE_REPLICATION['STICKY_SECONDS']
+            )
+        return response
@@ -0,0 +1,93 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from dgc.async_views import APIJSONResponse
+from dgc.db_router import use_primary
+
+
+def get_response_cache():
+    return caches[settings.RESPONSE_CACHE['ALIAS']]
+
+
+def get_response_timeout(cache):
+    """
+    ``RESPONSE_CACHE['TIMEOUT']``, at most ``LOCAL_TIMEOUT`` for a process local cache, which changes made by the
+    other workers don't invalidate.
+    """
+    timeout = settings.RESPONSE_CACHE['TIMEOUT']
+    if isinstance(cache, LocMemCache):
+        timeout = min(timeout, settings.RESPONSE_CACHE['LOCAL_TIMEOUT'])
+    return timeout
+
+
+def get_version_key(model):
+    return f'response-version:{model._meta.label_lower}'
+
+
+def invalidate_responses(model):
+    """
+    Start a new cache version for ``model`` once the transaction commits, called from its post_save/post_delete
+    signals. Before that, the change isn't visible to the request that would render the new version.
+    """
+    transaction.on_commit(lambda: get_response_cache().set(get_version_key(model), time.time(), None))
+
+
+async def aget_version(model):
+    """Return the current cache version of ``model``, the time it last changed."""
+    cache = get_response_cache()
+    key = get_version_key(model)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time(), None)
+        version = await cache.aget(key)
+    return version
+
+
+class CachedResponseMixin:
+    """
+    Caches the rendered JSON of an async view's GET per absolute URL, with a strong ``ETag`` and a
+    ``Last-Modified`` of the last change of ``cache_model``, so unchanged resources are answered with 304.
+    Entries are dropped when ``cache_model`` is saved or deleted, see :func:`invalidate_responses`.
+    """
+    cache_model = None
+
+    async def get(self, request, *args, **kwargs):
+        cache = get_response_cache()
+        version = await aget_version(self.cache_model)
+        url_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        key = f'response:{self.cache_model._meta.label_lower}:{version}:{url_hash}'
+
+        cached = await cache.aget(key)
+        if cached is None:
+            if time.time() - version < settings.DATABASE_REPLICATION['STICKY_SECONDS']:
+                # Render a recent change from the primary, a lagging replica would be cached for this version.
+                with use_primary():
+                    response = await super().get(request, *args, **kwargs)
+            else:
+                response = await super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cached = {
+                'content': response.content,
+                'etag': quote_etag(hashlib.sha1(response.content).hexdigest()),
+            }
+            await cache.aset(key, cached, get_response_timeout(cache))
+
+        # Rounded up, a truncated date would be before the change it stands for.
+        last_modified = math.ceil(version)
+        response = get_conditional_response(request, etag=cached['etag'], last_modified=last_modified)
+        if response is not None:
+            return response
+
+        return APIJSONResponse(content=cached['content'], headers={
+            'ETag': cached['etag'],
+            'Last-Modified': http_date(last_modified),
+        })
@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'dgc.middleware.MetricsMiddleware',
+    'dgc.middleware.PrimaryDatabaseMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -60,6 +62,13 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per route latency, SQL and response size histograms served at api/metrics/, see dgc.middleware.MetricsMiddleware.
+# Requests issuing more than QUERY_BUDGET queries are logged as possible N+1 patterns.
+METRICS = {
+    'ENABLED': os.getenv('METRICS_ENABLED') == '1',
+    'QUERY_BUDGET': int(os.getenv('METRICS_QUERY_BUDGET', 20)),
+}
+
 ROOT_URLCONF = 'dgc.urls'
 
 TEMPLATES = [
@@ -83,20 +92,85 @@ WSGI_APPLICATION = 'dgc.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# DB_POOL=1 keeps a psycopg connection pool (psycopg-pool) of DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE connections per
+# worker process, checked before they are handed out. Without the pool, connections are kept open for
+# DB_CONN_MAX_AGE seconds between requests (0 closes them after every request) and checked with
+# DB_CONN_HEALTH_CHECKS before they are reused. Prefer the pool under ASGI, where requests run on different threads.
+DB_POOL = os.getenv('DB_POOL', '0').lower() in ('1', 'true', 'yes')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'django.db.backends.postgresql',
         'HOST': os.getenv('DB_HOST'),
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASS'),
         'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', '1').lower() in ('1', 'true', 'yes'),
         'OPTIONS': {
-            'client_encoding': 'utf8mb4',
+            'client_encoding': 'UTF8',
+            'sslmode': os.getenv('DB_SSLMODE', 'prefer'),
         }
     }
 }
 
+if DB_POOL:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        # Seconds a request waits for a free connection before failing
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 600)),
+        'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+        'check': ConnectionPool.check_connection,
+    }
+
+# Read replicas, DB_REPLICAS=host1,host2:5433 adds the aliases replica_1, replica_2 with the primary's settings.
+# Reads of the APPS models go to a random replica, writes, transactions and the requests of a client that wrote in
+# the last STICKY_SECONDS (tracked in the CACHE_ALIAS cache, which has to be shared by the workers) use the primary.
+# In tests the replicas mirror the primary, so the same settings run on a single (e.g. SQLite) database.
+DATABASE_REPLICATION = {
+    'REPLICAS': [],
+    'APPS': ('account', 'classroom'),
+    # Read right after they are written (login, registration)
+    'PRIMARY_MODELS': ('account.authtoken',),
+    'STICKY_SECONDS': int(os.getenv('DB_REPLICA_STICKY_SECONDS', 5)),
+    'CACHE_ALIAS': 'default',
+}
+
+for index, address in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    host, _, port = address.strip().partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICATION['REPLICAS'].append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['dgc.db_router.ReplicaRouter']
+
+# Cache shared by the workers, e.g. CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache and
+# CACHE_LOCATION=127.0.0.1:11211. The local memory default is only invalidated within each process.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Rendered responses of the notice and routine endpoints, see dgc.response_cache. A local memory cache is only
+# invalidated in the worker that made the change, its entries are kept at most LOCAL_TIMEOUT seconds.
+RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', 3600)),
+    'LOCAL_TIMEOUT': int(os.getenv('RESPONSE_CACHE_LOCAL_TIMEOUT', 10)),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -115,6 +189,31 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing (account.hashers). ALGORITHM ('scrypt', 'argon2' which needs argon2-cffi, or 'pbkdf2') hashes new
+# passwords, stored hashes of the other algorithms or with other costs are rehashed when their user logs in. At most
+# MAX_CONCURRENCY hashes run at once per worker, login, registration and password reset requests waiting longer than
+# QUEUE_TIMEOUT seconds get a 503.
+PASSWORD_HASHING = {
+    'ALGORITHM': os.getenv('PASSWORD_HASHER', 'scrypt'),
+    'ARGON2_TIME_COST': int(os.getenv('ARGON2_TIME_COST', 2)),
+    'ARGON2_MEMORY_COST': int(os.getenv('ARGON2_MEMORY_COST', 19456)),
+    'ARGON2_PARALLELISM': int(os.getenv('ARGON2_PARALLELISM', 1)),
+    'SCRYPT_WORK_FACTOR': int(os.getenv('SCRYPT_WORK_FACTOR', 2 ** 14)),
+    'SCRYPT_BLOCK_SIZE': int(os.getenv('SCRYPT_BLOCK_SIZE', 8)),
+    'SCRYPT_PARALLELISM': int(os.getenv('SCRYPT_PARALLELISM', 1)),
+    'MAX_CONCURRENCY': int(os.getenv('PASSWORD_HASHING_MAX_CONCURRENCY', 2)),
+    'QUEUE_TIMEOUT': float(os.getenv('PASSWORD_HASHING_QUEUE_TIMEOUT', 10)),
+}
+
+_PASSWORD_HASHERS = {
+    'scrypt': 'account.hashers.ScryptPasswordHasher',
+    'argon2': 'account.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'account.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHING['ALGORITHM']]] + [
+    hasher for algorithm, hasher in _PASSWORD_HASHERS.items() if algorithm != PASSWORD_HASHING['ALGORITHM']
+] + ['account.hashers.PBKDF2SHA1PasswordHasher']
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -138,6 +237,56 @@ if not DEBUG:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = 'media/'
 
+# How classroom.media.serve_file sends uploaded files: streamed by Django (BACKEND unset), or handed to the web
+# server with 'x-accel-redirect' (nginx, internal location at PREFIX aliased to MEDIA_ROOT) or 'x-sendfile'.
+MEDIA_SENDFILE = {
+    'BACKEND': os.getenv('MEDIA_SENDFILE_BACKEND'),
+    'PREFIX': os.getenv('MEDIA_SENDFILE_PREFIX', '/protected-media/'),
+    'CHUNK_SIZE': 512 * 1024,
+    # Cache lifetime of content addressed files requested with their digest (the file_url of the serializers)
+    'IMMUTABLE_MAX_AGE': 365 * 24 * 3600,
+}
+
+# Resumable lecture uploads (classroom.uploads). Partial files are kept in DIR, by default MEDIA_ROOT/.partial so
+# that finished uploads are moved into place on the same filesystem.
+CHUNKED_UPLOAD = {
+    'DIR': os.getenv('CHUNKED_UPLOAD_DIR'),
+    'MAX_SIZE': int(os.getenv('CHUNKED_UPLOAD_MAX_SIZE', 4 * 1024 ** 3)),
+    'MAX_CHUNK_SIZE': int(os.getenv('CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 16 * 1024 ** 2)),
+    # Seconds a chunk being written keeps other writers off the upload, after which a stalled one can be retried.
+    'LEASE': int(os.getenv('CHUNKED_UPLOAD_LEASE', 600)),
+}
+
+# Largest file accepted per model in a multipart request, checked while the body is read
+# (classroom.upload_handlers). Larger lectures are uploaded in chunks, see CHUNKED_UPLOAD.
+UPLOAD_MAX_SIZE = {
+    'routine': int(os.getenv('ROUTINE_UPLOAD_MAX_SIZE', 20 * 1024 ** 2)),
+    'notice': int(os.getenv('NOTICE_UPLOAD_MAX_SIZE', 20 * 1024 ** 2)),
+    'class': int(os.getenv('CLASS_UPLOAD_MAX_SIZE', 512 * 1024 ** 2)),
+    'assignment': int(os.getenv('ASSIGNMENT_UPLOAD_MAX_SIZE', 20 * 1024 ** 2)),
+    'submission': int(os.getenv('SUBMISSION_UPLOAD_MAX_SIZE', 20 * 1024 ** 2)),
+}
+
+# Renditions of the uploaded files made by the process_media worker (classroom.processing): thumbnails of images,
+# PDFs and videos, compressed images and lower bitrate videos. Images need Pillow, PDFs poppler's pdftoppm and
+# videos ffmpeg/ffprobe; files whose tool is not installed are skipped.
+MEDIA_PROCESSING = {
+    'ENABLED': os.getenv('MEDIA_PROCESSING', '1').lower() in ('1', 'true', 'yes'),
+    'FFMPEG': os.getenv('FFMPEG_BINARY', 'ffmpeg'),
+    'FFPROBE': os.getenv('FFPROBE_BINARY', 'ffprobe'),
+    'PDFTOPPM': os.getenv('PDFTOPPM_BINARY', 'pdftoppm'),
+    'THUMBNAIL_SIZE': 320,
+    'IMAGE_MAX_SIZE': 1920,
+    'IMAGE_QUALITY': 80,
+    # (height, video bitrate) of the video renditions, only the ones below the height of the upload are made
+    'VIDEO_RENDITIONS': [(360, '600k'), (720, '1500k')],
+    'AUDIO_BITRATE': '96k',
+    # Seconds a worker has for a job before another one picks it up again
+    'JOB_TIMEOUT': int(os.getenv('MEDIA_JOB_TIMEOUT', 3600)),
+    'MAX_ATTEMPTS': 3,
+    'RETRY_BACKOFF': 60,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -147,6 +296,37 @@ AUTH_USER_MODEL = 'account.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'account.authentication.CachedTokenAuthentication',
     ),
 }
+
+# Token -> user resolution cache used by account.authentication.CachedTokenAuthentication.
+# CACHE_ALIAS optionally names an entry of CACHES shared between worker processes.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.getenv('TOKEN_AUTH_CACHE_MAX_SIZE', 10000)),
+    'TTL': int(os.getenv('TOKEN_AUTH_CACHE_TTL', 60)),
+    'CACHE_ALIAS': os.getenv('TOKEN_AUTH_CACHE_ALIAS'),
+}
+
+# API tokens (account.tokens). Users have one token per client in NAMES, the first being the default, valid for
+# TTL seconds (0 for tokens that never expire) after which logging in issues a new one.
+AUTH_TOKEN = {
+    'NAMES': os.getenv('AUTH_TOKEN_NAMES', 'web,mobile').split(','),
+    'TTL': int(os.getenv('AUTH_TOKEN_TTL', 30 * 24 * 60 * 60)),
+}
+
+# Outbox drained by `python manage.py send_queued_emails`, see account.mail.
+EMAIL_OUTBOX = {
+    'BATCH_SIZE': int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 100)),
+    'MAX_ATTEMPTS': int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5)),
+    'RETRY_BACKOFF': int(os.getenv('EMAIL_OUTBOX_RETRY_BACKOFF', 60)),
+    # Seconds a claimed batch is skipped by other senders, it is sent again afterwards if its sender died.
+    'LEASE': int(os.getenv('EMAIL_OUTBOX_LEASE', 300)),
+}
+
+# Users imported with POST api/account/import/: the passwords are hashed in a pool of PROCESSES processes for the
+# request, and rows after MAX_ROWS are left out (the import_users command has no limit).
+USER_IMPORT = {
+    'PROCESSES': int(os.getenv('USER_IMPORT_PROCESSES', os.cpu_count() or 1)),
+    'MAX_ROWS': int(os.getenv('USER_IMPORT_MAX_ROWS', 5000)),
+}
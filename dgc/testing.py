@@ -0,0 +1,74 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from account.authentication import get_token_cache
+from dgc.response_cache import get_response_cache
+
+
+def explain(sql, params=()):
+    """Return the database's query plan for ``sql`` as text."""
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+
+def find_query(captured_queries, table):
+    """Return the first SQL statement of a ``CaptureQueriesContext`` reading from ``table``."""
+    for query in captured_queries:
+        if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']:
+            return query['sql']
+    raise AssertionError(f'No query on {table} was executed.')
+
+
+def analyze():
+    """Refresh the planner statistics after seeding test data."""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+class QueryCountTestMixin:
+    """
+    Pins the number of SQL queries of a view with :meth:`assertQueryCountConstant`, which repeats a request with
+    each of ``row_counts`` rows in the tables the view reads. Test cases implement ``create_rows(count)`` to add
+    ``count`` rows to those tables.
+    """
+    row_counts = (1, 10, 1000)
+
+    def create_rows(self, count):
+        raise NotImplementedError
+
+    def assertQueryCountConstant(self, max_queries, request, prepare=None):
+        """
+        Fail when ``request()`` issues more than ``max_queries`` queries, or more queries with more rows. Caches are
+        cleared first, so cached views are measured on a miss. ``prepare``, when given, runs before every request
+        without being counted and its return value is passed to ``request``, e.g. a fresh object to delete.
+        """
+        counts = {}
+        created = 0
+        for row_count in self.row_counts:
+            self.create_rows(row_count - created)
+            created = row_count
+
+            args = (prepare(),) if prepare else ()
+            get_token_cache().clear()
+            get_response_cache().clear()
+            with CaptureQueriesContext(connection) as context:
+                response = request(*args)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            response.close()
+
+            self.assertLess(response.status_code, 400, f'{row_count} rows: {getattr(response, "data", response)}')
+            queries = [query['sql'] for query in context.captured_queries]
+            self.assertLessEqual(
+                len(queries), max_queries,
+                f'{len(queries)} queries with {row_count} rows, expected at most {max_queries}:\n' + '\n'.join(queries)
+            )
+            counts[row_count] = len(queries)
+
+        first = counts[self.row_counts[0]]
+        self.assertTrue(
+            all(count <= first for count in counts.values()),
+            f'The number of queries grows with the number of rows: {counts}'
+        )
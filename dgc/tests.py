@@ -0,0 +1,146 @@
+import importlib.util
+import os
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from account.authentication import get_token_cache
+from account.models import User, AuthToken
+from classroom.models import Class, Notice
+from dgc.db_router import ReplicaRouter, get_sticky_cache, mark_recent_write, use_primary
+from dgc.metrics import HISTOGRAMS
+from dgc.middleware import PrimaryDatabaseMiddleware
+from dgc.response_cache import get_response_cache
+
+
+@override_settings(METRICS={'ENABLED': True, 'QUERY_BUDGET': 3})
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        for histogram in HISTOGRAMS:
+            histogram.clear()
+        get_token_cache().clear()
+        get_response_cache().clear()
+
+        self.client = APIClient()
+        self.admin_user = User.objects.create_user(email="admin@example.com", user_type="admin", password="password")
+        self.admin_token = AuthToken.objects.create(user=self.admin_user)
+
+    def get_metrics(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode()
+
+    def test_request_metrics(self):
+        Notice.objects.create(title='Notice')
+        self.client.get(reverse('notices'))
+        self.client.get(reverse('notice', args=[1]))
+
+        metrics = self.get_metrics()
+        self.assertIn('dgc_request_duration_seconds_count{method="GET",route="/api/notices/"} 1', metrics)
+        self.assertIn('dgc_request_db_queries_sum{method="GET",route="/api/notices/"} 1', metrics)
+        self.assertIn('dgc_request_db_queries_count{method="GET",route="/api/notices/<int:pk>/"} 1', metrics)
+        self.assertIn('dgc_response_size_bytes_bucket{method="GET",route="/api/notices/",le="+Inf"} 1', metrics)
+        self.assertIn('# TYPE dgc_request_db_duration_seconds histogram', metrics)
+
+    def test_query_budget_warning(self):
+        Notice.objects.create(title='Notice')
+        with self.assertLogs('dgc.metrics', 'WARNING') as logs:
+            with self.settings(METRICS={'ENABLED': True, 'QUERY_BUDGET': 1}):
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token.key)
+                client.get(reverse('notices'))
+        # Token lookup and the notices page
+        self.assertIn('GET /api/notices/ issued 2 queries (budget 1)', logs.output[0])
+
+    def test_metrics_admin_only(self):
+        user = User.objects.create_user(email="student@example.com", password="password")
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + AuthToken.objects.create(user=user).key)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+
+REPLICATION = {
+    'REPLICAS': ['replica_1'],
+    'APPS': ('account', 'classroom'),
+    'PRIMARY_MODELS': ('account.authtoken',),
+    'STICKY_SECONDS': 5,
+    'CACHE_ALIAS': 'default',
+}
+
+
+@override_settings(DATABASE_REPLICATION=REPLICATION)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        get_sticky_cache().clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def test_router(self):
+        self.assertEqual(self.router.db_for_read(Class), 'replica_1')
+        self.assertEqual(self.router.db_for_read(User), 'replica_1')
+        self.assertEqual(self.router.db_for_read(AuthToken), 'default')
+        self.assertIsNone(self.router.db_for_read(ContentType))
+        self.assertEqual(self.router.db_for_write(Class, instance=Class(title='Class')), 'default')
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Class), 'default')
+
+        self.assertFalse(self.router.allow_migrate('replica_1', 'classroom'))
+        self.assertIsNone(self.router.allow_migrate('default', 'classroom'))
+
+        with override_settings(DATABASE_REPLICATION={**REPLICATION, 'REPLICAS': []}):
+            self.assertEqual(self.router.db_for_read(Class), 'default')
+
+    def request(self, method, key):
+        databases = []
+
+        def get_response(request):
+            databases.append(self.router.db_for_read(Class))
+            return HttpResponse()
+
+        request = getattr(self.factory, method)('/api/classes/', HTTP_AUTHORIZATION=f'Token {key}')
+        PrimaryDatabaseMiddleware(get_response)(request)
+        return databases[0]
+
+    def test_read_your_writes(self):
+        self.assertEqual(self.request('get', 'writer'), 'replica_1')
+        self.assertEqual(self.request('patch', 'writer'), 'default')
+
+        # The writer reads from the primary until the replicas caught up, other clients keep using them.
+        self.assertEqual(self.request('get', 'writer'), 'default')
+        self.assertEqual(self.request('get', 'reader'), 'replica_1')
+
+        mark_recent_write('reader')
+        self.assertEqual(self.request('get', 'reader'), 'default')
+        self.assertEqual(self.router.db_for_read(Class), 'replica_1')
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    def load_settings(self, **environ):
+        """Execute a fresh copy of dgc.settings with ``environ`` set, leaving the loaded settings alone."""
+        spec = importlib.util.find_spec('dgc.settings')
+        module = importlib.util.module_from_spec(spec)
+        with mock.patch.dict(os.environ, environ):
+            spec.loader.exec_module(module)
+        return module.DATABASES['default']
+
+    def test_persistent_connections(self):
+        database = self.load_settings(DB_POOL='0', DB_CONN_MAX_AGE='120', DB_CONN_HEALTH_CHECKS='false')
+        self.assertEqual(database['CONN_MAX_AGE'], 120)
+        self.assertFalse(database['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('pool', database['OPTIONS'])
+
+    def test_pool(self):
+        from psycopg_pool import ConnectionPool
+
+        database = self.load_settings(DB_POOL='1', DB_CONN_MAX_AGE='120', DB_POOL_MIN_SIZE='4', DB_POOL_TIMEOUT='2.5')
+        # Connections are returned to the pool after each request instead of being kept by the thread
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        pool = database['OPTIONS']['pool']
+        self.assertEqual((pool['min_size'], pool['max_size'], pool['timeout']), (4, 10, 2.5))
+        self.assertIs(pool['check'], ConnectionPool.check_connection)
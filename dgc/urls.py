@@ -19,10 +19,13 @@ from django.contrib import admin
 from django.conf.urls.static import static
 from django.urls import include, path
 
+from dgc.metrics import MetricsAPIView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/account/', include('account.urls')),
     path('api/', include('classroom.urls')),
+    path('api/metrics/', MetricsAPIView.as_view(), name='metrics'),
 ]
 
 if settings.DEBUG: